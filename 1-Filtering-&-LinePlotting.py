@@ -39,10 +39,10 @@ import pandas as pd
 # In[2]:
 
 
-df_can = pd.read_excel('https://s3-api.us-geo.objectstorage.softlayer.net/cf-courses-data/CognitiveClass/DV0101EN/labs/Data_Files/Canada.xlsx',
-                       sheet_name='Canada by Citizenship',
-                       skiprows=range(20),
-                       skipfooter=2)
+from canada_data import load_canada
+
+# the workbook is downloaded and parsed once, later runs read it from the local cache
+df_can = load_canada()
 
 
 # In[3]:
@@ -87,7 +87,8 @@ df_can.columns
 # In[8]:
 
 
-df_can['Total'] = df_can.sum(axis=1)
+# summing the year columns only: Country, Continent, Region and DevName are text
+df_can['Total'] = df_can[list(range(1980, 2014))].sum(axis=1)
 
 
 # Checking for null values in the data set:
@@ -203,6 +204,22 @@ df_can[condition]
 df_can[(df_can['Continent']=='Asia') & (df_can['Region']=='Southern Asia')]
 
 
+# The same filter answered from a bitmap index: one packed bitmap per Continent, Region and DevName value, combined with `&`, `|` and `~`. Filters that are used again are served from a cache.
+
+# In[ ]:
+
+
+from year_matrix import YearMatrix
+from bitmap_index import BitmapIndex
+
+matrix = YearMatrix.from_frame(df_can, years)
+index = BitmapIndex(matrix)
+
+# row positions of the matching countries, usable on df_can and on the year matrix alike
+south_asia = index.rows(index.eq('Continent', 'Asia') & index.eq('Region', 'Southern Asia'))
+df_can.iloc[south_asia]
+
+
 # Reviewing changes made so far.
 
 # In[23]:
@@ -249,14 +266,20 @@ haiti.index = haiti.index.map(int) #changing the index values of Haiti to type i
 # In[28]:
 
 
-haiti.plot(kind='line')
+from events import detect_events, annotate_events
+
+# spikes, dips and level shifts of every country, found in one pass over the year matrix
+events = detect_events(matrix)
+
+ax = haiti.plot(kind='line')
 
 plt.title('Immigration from Haiti')
 plt.ylabel('Number of Immigrants')
 plt.xlabel('Years')
 
-# annotating the 2010 Earthquake. 
-plt.text(2000, 6000, '2010 Earthquake') # see note below
+# annotating the 2010 Earthquake: the arrow points at Haiti's strongest detected event in 2010 - 2011
+# (the chart is drawn without it, and a warning is shown, when the data has no event there)
+annotate_events(ax, events[events['country'] == 'Haiti'], labels={(2010, 2011): '2010 Earthquake'})
 
 plt.show() 
 
@@ -296,18 +319,15 @@ plt.show()
 # In[32]:
 
 
-#Sorting the 'Total' column to get the top 5 countries using pandas sort_values() method.
-##inplace = True paramemter saves the changes to the original df_can dataframe
-df_can.sort_values(by='Total', ascending=False, axis=0, inplace=True)
+from rankings import RankingIndex
 
-# passing the top 5 entries
-df_top5 = df_can.head(5)
+# ranking the countries by the 'Total' column without re-sorting df_can
+ranking = RankingIndex(matrix)
 
-# transposing the dataframe
-df_top5 = df_top5[years].transpose() 
+# the top 5 countries, years (as integers) down and countries across
+df_top5 = matrix.frame(ranking.top(5))
 
 #Plotting the dataframe. 
-df_top5.index = df_top5.index.map(int) # Changing index values of df_top5 to type integer for plotting
 df_top5.plot(kind='line', figsize=(14, 8))
 
 plt.title('Immigration Trend of Top 5 Countries')
@@ -316,3 +336,25 @@ plt.xlabel('Years')
 
 plt.show()
 
+
+
+# #### Comparing every country at once: small multiples
+# 
+# One sparkline per country in a single figure, all on the same scale, ordered by total immigration. The whole grid is drawn as one line collection, so it takes about as long as a single chart.
+
+# In[ ]:
+
+
+from line_charts import draw_small_multiples
+
+draw_small_multiples(matrix.frame(ranking.top(len(matrix.countries))),
+                     title='Immigration to Canada by Country, 1980 - 2013')
+
+
+# The same for a filtered set, here the European countries, each scaled to its own maximum.
+
+# In[ ]:
+
+
+europe = index.countries(index.eq('Continent', 'Europe'))
+draw_small_multiples(matrix.frame(europe), sharey=False, title='Immigration from Europe')
@@ -38,11 +38,11 @@ import pandas as pd
 # In[2]:
 
 
-df_can = pd.read_excel('https://s3-api.us-geo.objectstorage.softlayer.net/cf-courses-data/CognitiveClass/DV0101EN/labs/Data_Files/Canada.xlsx',
-                       sheet_name='Canada by Citizenship',
-                       skiprows=range(20),
-                       skipfooter=2
-                      )
+from canada_data import load_clean_canada
+
+# the cleaned data (code columns dropped, columns renamed, indexed by country, 'Total' added)
+# is built once and memory-mapped from a local snapshot on later runs
+df_can = load_clean_canada()
 
 
 # In[3]:
@@ -57,76 +57,27 @@ df_can.head()
 print(df_can.shape)
 
 
-# #### Cleaning up the dataset to remove columns that are not informative  for visualization 
-
-# In[5]:
-
-
-df_can.drop(['AREA', 'REG', 'DEV', 'Type', 'Coverage'], axis=1, inplace=True)
-
-df_can.head()
-
-
-# #### Renaming some columns so that they make sense.
-
-# In[6]:
-
-
-df_can.rename(columns={'OdName':'Country', 'AreaName':'Continent','RegName':'Region'}, inplace=True)
-
-df_can.head()
-
-
-# #### For consistency, ensuring that all column labels of type string.
-
-# In[7]:
-
-
-all(isinstance(column, str) for column in df_can.columns)
-
-
-# The above line of code returned *False* when it was tested if all the column labels are of type **string**. They will be converted to type string.
-
-# In[8]:
-
-
-df_can.columns = list(map(str, df_can.columns))
-
-all(isinstance(column, str) for column in df_can.columns)
-
-
-# #### Setting the country name as index - useful for quickly looking up countries using .loc method.
-
-# In[9]:
+# The dataframe is indexed by country, all column labels are strings, and the extra 'Total' column presents the total number of immigrants from each country in the dataset from 1980 - 2013. 
 
+# In[11]:
 
-df_can.set_index('Country', inplace=True)
-
-df_can.head()
-
-
-# #### Adding a 'total' column
-
-# In[10]:
 
+print ('data dimensions:', df_can.shape)
 
-df_can['Total'] = df_can.sum(axis=1)
 
-df_can.head()
+# In[12]:
 
 
-# Now the dataframe has an extra column that presents the total number of immigrants from each country in the dataset from 1980 - 2013. 
+get_ipython().run_cell_magic('capture', '', '#Creating a list of years from 1980 - 2013 for plotting purposes\nyears = list(map(str, range(1980, 2014)))\n\nyears')
 
-# In[11]:
 
+# In[13]:
 
-print ('data dimensions:', df_can.shape)
 
+from year_matrix import YearMatrix
 
-# In[12]:
-
-
-get_ipython().run_cell_magic('capture', '', '#Creating a list of years from 1980 - 2013 for plotting purposes\nyears = list(map(str, range(1980, 2014)))\n\nyears')
+# the same 1980 - 2013 counts as one int32 country x year block; the per-chart selections below are views into it
+matrix = YearMatrix.load()
 
 
 # <a id="ref3"></a> 
@@ -150,12 +101,13 @@ print ('Matplotlib version: ', mpl.__version__)
 # In[15]:
 
 
-df_can.sort_values(['Total'], ascending=False, axis=0, inplace=True)
+from rankings import RankingIndex
 
-df_top5 = df_can.head()
+# ranks countries by 'Total' without re-sorting df_can
+ranking = RankingIndex(matrix)
 
-# transpose the dataframe
-df_top5 = df_top5[years].transpose() 
+# the top 5 countries, years down and countries across
+df_top5 = matrix.frame(ranking.top(5))
 
 df_top5.head()
 
@@ -165,11 +117,13 @@ df_top5.head()
 # In[16]:
 
 
-df_top5.plot(kind='area', 
-             alpha=0.25, # 0-1, default value a= 0.5
-             stacked=False,
-             figsize=(20, 10),
-            )
+from area_charts import StackedArea
+
+# band boundaries computed once from the block; long series would be downsampled before drawing
+plt.figure(figsize=(20, 10))
+StackedArea.from_frame(df_top5, stacked=False).draw(plt.gca(), 
+                                                    alpha=0.25, # 0-1, default value a= 0.5
+                                                    )
 
 plt.title('Immigration Trend of Top 5 Countries')
 plt.ylabel('Number of Immigrants')
@@ -183,7 +137,8 @@ plt.show()
 # In[17]:
 
 
-ax = df_top5.plot(kind='area', alpha=0.35, figsize=(20, 10))
+fig, ax = plt.subplots(figsize=(20, 10))
+StackedArea.from_frame(df_top5).draw(ax, alpha=0.35)
 
 ax.set_title('Immigration Trend of Top 5 Countries')
 ax.set_ylabel('Number of Immigrants')
@@ -195,20 +150,11 @@ ax.set_xlabel('Years')
 # In[18]:
 
 
-df_can.sort_values(['Total'], ascending=True, axis=0, inplace=True)
-
-# getting the bottom 5 entries
-df_bottom5 = df_can.head()
+# getting the bottom 5 entries, years down and countries across
+df_bottom5 = matrix.frame(ranking.bottom(5))
 
-# transposing the dataframe
-df_bottom5 = df_bottom5[years].transpose() 
-
-df_bottom5.index = df_bottom5.index.map(int) # changing the index values of df_bottom5 to type integer for plotting
-df_bottom5.plot(kind='area',
-             alpha = 0.45,
-             stacked=True,
-             figsize=(20, 10), # passing a tuple (x, y) size
-             )
+plt.figure(figsize=(20, 10)) # passing a tuple (x, y) size
+StackedArea.from_frame(df_bottom5, stacked=True).draw(plt.gca(), alpha=0.45)
 
 plt.title('Immigration Trend of Bottom 5 Countries')
 plt.ylabel('Number of Immigrants')
@@ -222,7 +168,8 @@ plt.show()
 # In[19]:
 
 
-ax2 = df_bottom5.plot(kind='area', alpha=0.55, stacked=False, figsize=(20, 10))
+fig, ax2 = plt.subplots(figsize=(20, 10))
+StackedArea.from_frame(df_bottom5, stacked=False).draw(ax2, alpha=0.55)
 
 ax2.set_title('Immigration Trend of Bottom 5 Countries')
 ax2.set_ylabel('Number of Immigrants')
@@ -243,8 +190,11 @@ df_can['2013'].head()
 # In[21]:
 
 
-# np.histogram returns 2 values
-count, bin_edges = np.histogram(df_can['2013'])
+from histograms import Histogram
+
+# binned once: the counts and the bin edges (default = 10 bins) are kept together
+hist_2013 = Histogram.from_values(df_can['2013'])
+count, bin_edges = hist_2013.counts, hist_2013.edges
 
 print(count) # frequency count
 print(bin_edges) # bin ranges, default = 10 bins
@@ -258,7 +208,9 @@ print(bin_edges) # bin ranges, default = 10 bins
 # In[22]:
 
 
-df_can['2013'].plot(kind='hist', figsize=(8, 5))
+# the bars are drawn from the counts above, without binning the column again
+fig, ax = plt.subplots(figsize=(8, 5))
+hist_2013.draw(ax, xticks=False)
 
 plt.title('Histogram of Immigration from 195 Countries in 2013')
 plt.ylabel('Number of Countries') 
@@ -274,10 +226,9 @@ plt.show()
 # In[23]:
 
 
-# 'bin_edges' is a list of bin intervals
-count, bin_edges = np.histogram(df_can['2013'])
-
-df_can['2013'].plot(kind='hist', figsize=(8, 5), xticks=bin_edges)
+# 'bin_edges' is a list of bin intervals, used as the xticks
+fig, ax = plt.subplots(figsize=(8, 5))
+hist_2013.draw(ax, xticks=True)
 
 plt.title('Histogram of Immigration from 195 countries in 2013') 
 plt.ylabel('Number of Countries') 
@@ -297,27 +248,23 @@ df_can.loc[['Denmark', 'Norway', 'Sweden'], years]
 # In[25]:
 
 
-# transposing dataframe
-df_t = df_can.loc[['Denmark', 'Norway', 'Sweden'], years].transpose()
+# years down, countries across (the transposed selection, without copying)
+df_t = matrix.frame(['Denmark', 'Norway', 'Sweden'])
 df_t.head()
 
 
 # In[29]:
 
 
-count, bin_edges = np.histogram(df_t, 15)
-xmin = bin_edges[0] - 10   #  first bin value is 31.0, adding buffer of 10 for aesthetic purposes 
-xmax = bin_edges[-1] + 10  #  last bin value is 308.0, adding buffer of 10 for aesthetic purposes
+from histograms import MultiHistogram
 
-# stacked Histogram
-df_t.plot(kind='hist',
-          figsize=(10, 6), 
-          bins=15,
-          xticks=bin_edges,
-          color=['coral', 'darkslateblue', 'mediumseagreen'],
-          stacked=True,
-          xlim=(xmin, xmax)
-         )
+# the three countries binned together in one pass: 15 shared bins, one row of counts per country
+hist_t = MultiHistogram.from_block(df_t, 15)
+count, bin_edges = hist_t.counts, hist_t.edges
+
+# stacked Histogram, with a buffer of 10 on both sides of the x axis for aesthetic purposes
+fig, ax = plt.subplots(figsize=(10, 6))
+hist_t.draw(ax, stacked=True, margin=10, colors=['coral', 'darkslateblue', 'mediumseagreen'])
 
 plt.title('Histogram of Immigration from Denmark, Norway, and Sweden from 1980 - 2013')
 plt.ylabel('Number of Years')
@@ -331,22 +278,15 @@ plt.show()
 # In[28]:
 
 
-df_cof = df_can.loc[['Greece', 'Albania', 'Bulgaria'], years]
-
-# transpose dataframe
-df_cof = df_cof.transpose() 
+# years down, countries across (the transposed selection, without copying)
+df_cof = matrix.frame(['Greece', 'Albania', 'Bulgaria'])
 
-#x-tick values
-count, bin_edges = np.histogram(df_cof, 15)
+# counts and x-tick values of the three countries in one pass
+hist_cof = MultiHistogram.from_block(df_cof, 15)
 
 # Un-stacked Histogram
-df_cof.plot(kind ='hist',
-            figsize=(10, 6),
-            bins=15,
-            alpha=0.35,
-            xticks=bin_edges,
-            color=['coral', 'darkslateblue', 'mediumseagreen']
-            )
+fig, ax = plt.subplots(figsize=(10, 6))
+hist_cof.draw(ax, alpha=0.35, colors=['coral', 'darkslateblue', 'mediumseagreen'])
 plt.title('Histogram of Immigration from Greece, Albania, and Bulgaria from 1980 - 2013')
 plt.ylabel('Number of Years')
 plt.xlabel('Number of Immigrants')
@@ -362,34 +302,28 @@ plt.show()
 # In[29]:
 
 
-df_iceland = df_can.loc['Iceland', years]
+df_iceland = matrix.frame(['Iceland'])['Iceland']
 df_iceland.head()
 
 
 # In[32]:
 
 
-df_iceland.plot(kind='bar', figsize=(10, 6), rot=90) 
+from events import detect_events, annotate_events
+
+ax = df_iceland.plot(kind='bar', figsize=(10, 6), rot=90) 
 
 plt.xlabel('Year')
 plt.ylabel('Number of Immigrants')
 plt.title('Icelandic Immigrants to Canada from 1980 to 2013')
 
-# Annotate arrow
-plt.annotate('',                      # s: str. will leave it blank for no text
-             xy=(32, 70),             # place head of the arrow at point (year 2012 , pop 70)
-             xytext=(28, 20),         # place base of the arrow at point (year 2008 , pop 20)
-             xycoords='data',         # will use the coordinate system of the object being annotated 
-             arrowprops=dict(arrowstyle='->', connectionstyle='arc3', color='blue', lw=2)
-            )
-
-# Annotate Text
-plt.annotate('2008 - 2011 Financial Crisis', # text to display
-             xy=(28, 30),                    # start the text at at point (year 2008 , pop 30)
-             rotation=72.5,                  # based on trial and error to match the arrow
-             va='bottom',                    # want the text to be vertically 'bottom' aligned
-             ha='left',                      # want the text to be horizontally 'left' algned.
-            )
+# the level shift of every country in one pass; Iceland's marks where the financial crisis set in
+breaks = detect_events(matrix, kinds=['break'])
+
+# Annotate the shift found in 2008 - 2011: arrow and text are anchored on the bar where it starts
+# (bars sit at positions 0, 1, ...); without a shift there the bars are drawn unlabelled, with a warning
+annotate_events(ax, breaks[breaks['country'] == 'Iceland'], x='position',
+                labels={(2008, 2011): '2008 - 2011 Financial Crisis'})
 
 plt.show()
 
@@ -401,11 +335,8 @@ plt.show()
 # In[33]:
 
 
-# sorting dataframe on 'Total' column (descending)
-df_can.sort_values(by='Total', ascending=True, inplace=True)
-
-#top 15 countries
-df_top15 = df_can['Total'].tail(15)
+#top 15 countries, smallest first so that the largest bar ends up on top
+df_top15 = df_can.loc[ranking.top(15)[::-1], 'Total']
 df_top15
 
 
@@ -417,12 +348,11 @@ df_top15.plot(kind='barh', figsize=(12, 12), color='steelblue')
 plt.xlabel('Number of Immigrants')
 plt.title('Top 15 Conuntries Contributing to the Immigration to Canada between 1980 - 2013')
 
-# annotates value labels to each country
-for index, value in enumerate(df_top15): 
-    label = format(int(value), ',') # formatting int with commas
-    
-    # places text at the end of bar (subtracting 47000 from x, and 0.1 from y to make it fit within the bar)
-    plt.annotate(label, xy=(value - 47000, index - 0.10), color='white')
+from bar_charts import label_bars
+
+# value labels for every country at once: formatted with commas and placed just inside the end of each bar,
+# drawn as one collection instead of one annotation per bar
+label_bars(plt.gca(), plt.gca().containers[0], df_top15, position='inside', color='white')
 
 
 
@@ -39,11 +39,11 @@ import pandas as pd
 # In[2]:
 
 
-df_can = pd.read_excel('https://s3-api.us-geo.objectstorage.softlayer.net/cf-courses-data/CognitiveClass/DV0101EN/labs/Data_Files/Canada.xlsx',
-                       sheet_name='Canada by Citizenship',
-                       skiprows=range(20),
-                       skipfooter=2
-                      )
+from canada_data import load_clean_canada
+
+# the cleaned data (code columns dropped, columns renamed, indexed by country, 'Total' added)
+# is built once and memory-mapped from a local snapshot on later runs
+df_can = load_clean_canada()
 
 
 # In[3]:
@@ -61,24 +61,18 @@ print(df_can.shape)
 # In[5]:
 
 
-# Removing unnecessary columns 
-df_can.drop(['AREA', 'REG', 'DEV', 'Type', 'Coverage'], axis=1, inplace=True)
+# years that will be used
+years = list(map(str, range(1980, 2014)))
+print('data dimensions:', df_can.shape)
 
-# renaming the columns so that they make sense
-df_can.rename(columns={'OdName':'Country', 'AreaName':'Continent','RegName':'Region'}, inplace=True)
 
-# for sake of consistency, making all column labels of type string
-df_can.columns = list(map(str, df_can.columns))
+# In[ ]:
 
-# setting the country name as index - useful for quickly looking up countries using .loc method
-df_can.set_index('Country', inplace=True)
 
-# adding total column
-df_can['Total'] = df_can.sum(axis=1)
+from year_matrix import YearMatrix
 
-# years that will be used
-years = list(map(str, range(1980, 2014)))
-print('data dimensions:', df_can.shape)
+# the same 1980 - 2013 counts as one int32 country x year block; the per-chart selections below are views into it
+matrix = YearMatrix.load()
 
 
 # <a id="ref3"></a> 
@@ -103,10 +97,15 @@ print('Matplotlib version: ', mpl.__version__) # >= 2.0.0
 # In[7]:
 
 
-# grouping countries by continents and applying sum() function 
-df_continents = df_can.groupby('Continent', axis=0).sum()
+from aggregate_cube import AggregateCube
+from shares import share_table, draw_shares
+
+# year sums for every Continent x Region x DevName combination, built once in a single pass over the matrix
+cube = AggregateCube(matrix)
 
-print(type(df_can.groupby('Continent', axis=0)))
+# rolling the cube up to continents replaces grouping every column of df_can, text columns included;
+# 'Share' holds each continent's percentage of the total
+df_continents = share_table(cube.query(by='Continent'))
 
 df_continents.head()
 
@@ -119,13 +118,12 @@ df_continents.head()
 # In[8]:
 
 
-# autopct creates %, start angle represents starting point
-df_continents['Total'].plot(kind='pie',
-                            figsize=(5, 6),
-                            autopct='%1.1f%%', 
-                            startangle=90,    
-                            shadow=True,            
-                            )
+# the percentages come from the 'Share' column, start angle represents starting point
+plt.figure(figsize=(5, 6))
+draw_shares(plt.gca(), df_continents,
+            startangle=90,    
+            shadow=True,            
+            )
 
 plt.title('Immigration to Canada by Continent [1980 - 2013]')
 plt.axis('equal') # Sets the pie chart to look like a circle.
@@ -147,16 +145,15 @@ plt.show()
 colors_list = ['gold', 'yellowgreen', 'lightcoral', 'lightskyblue', 'lightgreen', 'pink']
 explode_list = [0.1, 0, 0, 0, 0.1, 0.1] # ratio for each continent with which to offset each wedge.
 
-df_continents['Total'].plot(kind='pie',
-                            figsize=(15, 6),
-                            autopct='%1.1f%%', 
-                            startangle=90,    
-                            shadow=True,       
-                            labels=None,         # turn off labels on pie chart
-                            pctdistance=1.12,    # the ratio between the center of each pie slice and the start of the text generated by autopct 
-                            colors=colors_list,  # add custom colors
-                            explode=explode_list # 'explode' lowest 3 continents
-                            )
+plt.figure(figsize=(15, 6))
+draw_shares(plt.gca(), df_continents,
+            startangle=90,    
+            shadow=True,       
+            labels=False,        # turn off labels on pie chart
+            pctdistance=1.12,    # the ratio between the center of each pie slice and the start of the percentage text 
+            colors=colors_list,  # add custom colors
+            explode=explode_list # 'explode' lowest 3 continents
+            )
 
 # scale the title up by 12% to match pctdistance
 plt.title('Immigration to Canada by Continent [1980 - 2013]', y=1.12) 
@@ -169,6 +166,22 @@ plt.legend(labels=df_continents.index, loc='upper left')
 plt.show()
 
 
+# The same by region: there are many more regions than continents, so only the 8 largest are kept and the rest are summed into 'Other'.
+
+# In[ ]:
+
+
+df_regions = share_table(cube.query(by='Region'), top=8, sort=True)
+
+plt.figure(figsize=(10, 8))
+draw_shares(plt.gca(), df_regions, labels=False, pctdistance=1.12, min_share=1)
+
+plt.title('Immigration to Canada by Region [1980 - 2013]', y=1.05)
+plt.legend(labels=df_regions.index, loc='upper left')
+
+plt.show()
+
+
 # <a id="ref4"></a> 
 # # Box Plots
 
@@ -179,14 +192,25 @@ plt.show()
 # In[11]:
 
 
-df_japan = df_can.loc[['Japan'], years].transpose()
+df_japan = matrix.frame(['Japan'])
 df_japan.head()
 
 
+# Quartiles, whiskers, outliers and the summary statistics are computed once, for all columns together, and reused by the plot and by `describe()`.
+
+# In[ ]:
+
+
+from box_stats import BoxStats
+
+box_japan = BoxStats(df_japan)
+
+
 # In[12]:
 
 
-df_japan.plot(kind='box', figsize=(8, 6))
+plt.figure(figsize=(8, 6))
+box_japan.draw(plt.gca())
 
 plt.title('Box plot of Japanese Immigrants from 1980 - 2013')
 plt.ylabel('Number of Immigrants')
@@ -197,7 +221,7 @@ plt.show()
 # In[13]:
 
 
-df_japan.describe()
+box_japan.describe()
 
 
 # #### Comparing the distribution of the number of new immigrants from India and China for the period 1980 - 2013.
@@ -207,20 +231,22 @@ df_japan.describe()
 # In[14]:
 
 
-df_CI = df_can.loc[['China', 'India'], years].transpose()
+df_CI = matrix.frame(['China', 'India'])
 df_CI.head()
 
 
 # In[15]:
 
 
-df_CI.describe()
+box_CI = BoxStats(df_CI)
+box_CI.describe()
 
 
 # In[16]:
 
 
-df_CI.plot(kind='box', figsize=(8, 6))
+plt.figure(figsize=(8, 6))
+box_CI.draw(plt.gca())
 
 plt.title('Box plot of Chinese and Indian Immigrants from 1980 - 2013')
 plt.ylabel('Number of Immigrants')
@@ -235,7 +261,8 @@ plt.show()
 # In[17]:
 
 
-df_CI.plot(kind='box', figsize=(10, 7), color='blue', vert=False)
+plt.figure(figsize=(10, 7))
+box_CI.draw(plt.gca(), color='blue', vert=False)
 
 plt.title('Box plots of Immigrants from China and India (1980 - 2013)')
 plt.xlabel('Number of Immigrants')
@@ -248,13 +275,13 @@ plt.show()
 # In[18]:
 
 
-fig = plt.figure() # create figure
+fig = plt.figure(figsize=(20, 6)) # create figure
 
 ax0 = fig.add_subplot(1, 2, 1) # add subplot 1 (1 row, 2 columns, first plot)
 ax1 = fig.add_subplot(1, 2, 2) # add subplot 2 (1 row, 2 columns, second plot). 
 
 # Subplot 1: Box plot
-df_CI.plot(kind='box', color='blue', vert=False, figsize=(20, 6), ax=ax0) # add to subplot 1
+box_CI.draw(ax0, color='blue', vert=False) # add to subplot 1
 ax0.set_title('Box Plots of Immigrants from China and India (1980 - 2013)')
 ax0.set_xlabel('Number of Immigrants')
 ax0.set_ylabel('Countries')
@@ -275,7 +302,12 @@ plt.show()
 # In[19]:
 
 
-df_top15 = df_can.sort_values(['Total'], ascending=False, axis=0).head(15)
+from rankings import RankingIndex
+
+# ranks countries by 'Total' without sorting a copy of df_can
+ranking = RankingIndex(matrix)
+
+df_top15 = df_can.loc[ranking.top(15)]
 df_top15
 
 
@@ -284,29 +316,29 @@ df_top15
 # In[20]:
 
 
-# create a list of all years in decades 80's, 90's, and 00's
-years_80s = list(map(str, range(1980, 1990))) 
-years_90s = list(map(str, range(1990, 2000))) 
-years_00s = list(map(str, range(2000, 2010))) 
+from periods import period_table
 
-# slice the original dataframe df_can to create a series for each decade
-df_80s = df_top15.loc[:, years_80s].sum(axis=1) 
-df_90s = df_top15.loc[:, years_90s].sum(axis=1) 
-df_00s = df_top15.loc[:, years_00s].sum(axis=1)
+# the decades 80's, 90's and 00's are given by their boundaries; all three are summed for every country in one call
+new_df = period_table(df_top15, [1980, 1990, 2000, 2010], how='sum')
 
 
-# merge the three series into a new data frame
-new_df = pd.DataFrame({'1980s': df_80s, '1990s': df_90s, '2000s':df_00s}) 
 
+new_df.head()
 
 
-new_df.head()
+# The same call gives any other breakdown of the full table, e.g. the yearly mean of every country per five-year window:
+
+# In[ ]:
+
+
+period_table(matrix, step=5, how='mean').head()
 
 
 # In[21]:
 
 
-new_df.describe()
+box_decades = BoxStats(new_df)
+box_decades.describe()
 
 
 # Plotting the box plots.
@@ -314,7 +346,8 @@ new_df.describe()
 # In[22]:
 
 
-new_df.plot(kind='box', figsize=(10,6))
+plt.figure(figsize=(10, 6))
+box_decades.draw(plt.gca())
 plt.title('Immigration from top 15 countries for decades 80s, 90s and 2000s')
 plt.show()
 
@@ -340,6 +373,14 @@ plt.show()
 new_df[new_df['2000s']> 209611.5]
 
 
+# The same outliers straight from the box statistics (values beyond the whiskers, per decade):
+
+# In[ ]:
+
+
+dict(zip(box_decades.labels, box_decades.fliers))
+
+
 # China and India are both considered as outliers since their population for the decade exceeds 209,611.5. 
 
 # <a id="ref5"></a> 
@@ -414,13 +455,24 @@ plt.show()
 'No. Immigrants = {0:.0f} * Year + {1:.0f}'.format(fit[0], fit[1]) 
 
 
+# The same straight-line fit for every country at once: one least-squares solve over all the series, with the R² of each fit. Sorting by slope ranks the countries by how fast immigration from them has been growing.
+
+# In[ ]:
+
+
+from trends import fit_trends
+
+df_trends = fit_trends(matrix)
+df_trends.sort_values('slope', ascending=False).head(10)
+
+
 # #### Creating a scatter plot of the total immigration from Denmark, Norway, and Sweden to Canada from 1980 to 2013.
 
 # In[28]:
 
 
 # create dataframe
-df_countries = df_can.loc[['Denmark', 'Norway', 'Sweden'], years].transpose()
+df_countries = matrix.frame(['Denmark', 'Norway', 'Sweden'])
 
 # create df_total by summing across three countries for each year
 df_total = pd.DataFrame(df_countries.sum(axis=1))
@@ -486,11 +538,13 @@ df_can_t.head()
 # In[31]:
 
 
-# normalizing Brazil data
-norm_brazil = (df_can_t['Brazil'] - df_can_t['Brazil'].min()) / (df_can_t['Brazil'].max() - df_can_t['Brazil'].min())
+from column_scales import ColumnScales
 
-# normalizing Argentina data
-norm_argentina = (df_can_t['Argentina'] - df_can_t['Argentina'].min()) / (df_can_t['Argentina'].max() - df_can_t['Argentina'].min())
+# min, max, mean and std of every country in one pass over the years x countries block, kept for all bubble plots
+scales = ColumnScales(matrix)
+
+# min-max normalized weights, scaled to bubble sizes, for Brazil and Argentina
+sizes = scales.sizes(['Brazil', 'Argentina'], scale=2000, offset=10)
 
 
 # Plotting the Data
@@ -505,7 +559,7 @@ ax0 = df_can_t.plot(kind='scatter',
                     figsize=(14, 8),
                     alpha=0.5,                  # transparency
                     color='green',
-                    s=norm_brazil * 2000 + 10,  # pass in weights 
+                    s=sizes['Brazil'],  # pass in weights 
                     xlim=(1975, 2015)
                    )
 
@@ -515,7 +569,7 @@ ax1 = df_can_t.plot(kind='scatter',
                     y='Argentina',
                     alpha=0.5,
                     color="blue",
-                    s=norm_argentina * 2000 + 10,
+                    s=sizes['Argentina'],
                     ax = ax0
                    )
 
@@ -537,11 +591,8 @@ ax0.legend(['Brazil', 'Argentina'], loc='upper left', fontsize='x-large')
 # In[33]:
 
 
-# normalizing China data
-norm_china = (df_can_t['China'] - df_can_t['China'].min()) / (df_can_t['China'].max() - df_can_t['China'].min())
-
-# normalizing India data
-norm_india = (df_can_t['India'] - df_can_t['India'].min()) / (df_can_t['India'].max() - df_can_t['India'].min())
+# served from the statistics computed above, nothing is rescanned
+sizes = scales.sizes(['China', 'India'], scale=2000, offset=10)
 
 
 # Generating the bubble plots.
@@ -556,7 +607,7 @@ ax0 = df_can_t.plot(kind='scatter',
                     figsize=(14, 8),
                     alpha=0.5,                  # transparency
                     color='green',
-                    s=norm_china * 2000 + 10,  # pass in weights 
+                    s=sizes['China'],  # pass in weights 
                     xlim=(1975, 2015)
                    )
 
@@ -566,7 +617,7 @@ ax1 = df_can_t.plot(kind='scatter',
                     y='India',
                     alpha=0.5,
                     color="blue",
-                    s=norm_india * 2000 + 10,
+                    s=sizes['India'],
                     ax = ax0
                    )
 
@@ -35,10 +35,11 @@ from PIL import Image # converting images into arrays
 # In[2]:
 
 
-df_can = pd.read_excel('https://s3-api.us-geo.objectstorage.softlayer.net/cf-courses-data/CognitiveClass/DV0101EN/labs/Data_Files/Canada.xlsx',
-                       sheet_name='Canada by Citizenship',
-                       skiprows=range(20),
-                       skipfooter=2)
+from canada_data import load_clean_canada
+
+# the cleaned data (code columns dropped, columns renamed, indexed by country, 'Total' added)
+# is built once and memory-mapped from a local snapshot on later runs
+df_can = load_clean_canada()
 
 
 # In[3]:
@@ -56,24 +57,18 @@ print(df_can.shape)
 # In[5]:
 
 
-# Removing unnecessary columns
-df_can.drop(['AREA','REG','DEV','Type','Coverage'], axis = 1, inplace = True)
+# years that will be used
+years = list(map(str, range(1980, 2014)))
+print ('data dimensions:', df_can.shape)
 
-# Renaming the columns so that they make sense
-df_can.rename (columns = {'OdName':'Country', 'AreaName':'Continent','RegName':'Region'}, inplace = True)
 
-# for sake of consistency, making column labels of type string
-df_can.columns = list(map(str, df_can.columns))
+# In[ ]:
 
-# setting the country name as index - useful for quickly looking up countries using .loc method
-df_can.set_index('Country', inplace = True)
 
-# adds total column
-df_can['Total'] =  df_can.sum (axis = 1)
+from year_matrix import YearMatrix
 
-# years that will be used
-years = list(map(str, range(1980, 2014)))
-print ('data dimensions:', df_can.shape)
+# the same 1980 - 2013 counts as one int32 country x year block; the per-chart selections below are views into it
+matrix = YearMatrix.load()
 
 
 # <a id="ref2"></a> 
@@ -113,7 +108,10 @@ plt.figure(figsize=(15, 10))
 sns.set(font_scale=1.5)
 sns.set_style('whitegrid')
 
-ax = sns.regplot(x='year', y='total', data=df_tot, color='green', marker='+', scatter_kws={'s': 200})
+from regression import draw_regression
+
+# the same chart as sns.regplot, with the 95% band computed in closed form instead of from 1000 bootstrap refits
+ax = draw_regression(plt.gca(), df_tot['year'], df_tot['total'], color='green', marker='+', scatter_kws={'s': 200})
 ax.set(xlabel='Year', ylabel='Total Immigration')
 ax.set_title('Total Immigration to Canada from 1980 - 2013')
 
@@ -123,7 +121,7 @@ ax.set_title('Total Immigration to Canada from 1980 - 2013')
 # In[9]:
 
 
-df_countries = df_can.loc[['Denmark', 'Norway', 'Sweden'], years].transpose()
+df_countries = matrix.frame(['Denmark', 'Norway', 'Sweden'])
 
 # create df_total by summing across three countries for each year
 df_total = pd.DataFrame(df_countries.sum(axis=1))
@@ -145,8 +143,24 @@ sns.set(font_scale=1.5)
 sns.set_style('whitegrid')
 
 # generate plot and add title and axes labels
-ax = sns.regplot(x='year', y='total', data=df_total, color='green', marker='+', scatter_kws={'s': 200})
+ax = draw_regression(plt.gca(), df_total['year'], df_total['total'], color='green', marker='+', scatter_kws={'s': 200})
 ax.set(xlabel='Year', ylabel='Total Immigration')
 ax.set_title('Total Immigrationn from Denmark, Sweden, and Norway to Canada from 1980 - 2013')
 
 
+# The bootstrap band of regplot is still available: all resamples are fitted in one matrix operation and a seed makes it reproducible. The fitted lines and bands of every country come out of one call as well.
+
+# In[ ]:
+
+
+from regression import confidence_band
+
+# the bootstrap band of the Nordic total, drawn with a fixed seed
+yhat, lower, upper = confidence_band(df_total['year'], df_total['total'], band='bootstrap', n_boot=1000, seed=0)
+
+# analytic bands for all countries at once: one (grid, countries) array each
+df_all = matrix.frame()
+yhat_all, lower_all, upper_all = confidence_band(df_all.index, df_all.to_numpy())
+print(yhat_all.shape)
+
+
@@ -65,7 +65,11 @@ world_map
 # In[30]:
 
 
-df_incidents = pd.read_csv('https://s3-api.us-geo.objectstorage.softlayer.net/cf-courses-data/CognitiveClass/DV0101EN/labs/Data_Files/Police_Department_Incidents_-_Previous_Year__2016_.csv')
+from incidents_data import read_incidents
+
+# only the first 100 crimes are mapped, so reading stops once they have been parsed
+limit = 100
+df_incidents = read_incidents(limit=limit)
 
 
 # In[31]:
@@ -74,20 +78,20 @@ df_incidents = pd.read_csv('https://s3-api.us-geo.objectstorage.softlayer.net/cf
 df_incidents.head()
 
 
-# Each row consists of 13 features:
+# Each row consists of 11 features:
 # > 1. **IncidntNum**: Incident Number
 # > 2. **Category**: Category of crime or incident
 # > 3. **Descript**: Description of the crime or incident
 # > 4. **DayOfWeek**: The day of week on which the incident occurred
-# > 5. **Date**: The Date on which the incident occurred
-# > 6. **Time**: The time of day on which the incident occurred
-# > 7. **PdDistrict**: The police department district
-# > 8. **Resolution**: The resolution of the crime in terms whether the perpetrator was arrested or not
-# > 9. **Address**: The closest address to where the incident took place
-# > 10. **X**: The longitude value of the crime location 
-# > 11. **Y**: The latitude value of the crime location
-# > 12. **Location**: A tuple of the latitude and the longitude values
-# > 13. **PdId**: The police department ID
+# > 5. **Timestamp**: The date and time of day at which the incident occurred
+# > 6. **PdDistrict**: The police department district
+# > 7. **Resolution**: The resolution of the crime in terms whether the perpetrator was arrested or not
+# > 8. **Address**: The closest address to where the incident took place
+# > 9. **X**: The longitude value of the crime location 
+# > 10. **Y**: The latitude value of the crime location
+# > 11. **PdId**: The police department ID
+# 
+# The raw file's separate Date and Time columns are combined into **Timestamp** while reading, and its **Location** column (a text copy of Y and X) is skipped. The text columns are read as categoricals and the coordinates as 32-bit floats to keep the dataframe small.
 
 # In[32]:
 
@@ -95,14 +99,6 @@ df_incidents.head()
 df_incidents.shape
 
 
-# In[33]:
-
-
-# getting the first 100 crimes in the df_incidents dataframe
-limit = 100
-df_incidents = df_incidents.iloc[0:limit, :]
-
-
 # In[34]:
 
 
@@ -242,10 +238,10 @@ sanfran_map
 # In[41]:
 
 
-df_can = pd.read_excel('https://s3-api.us-geo.objectstorage.softlayer.net/cf-courses-data/CognitiveClass/DV0101EN/labs/Data_Files/Canada.xlsx',
-                     sheet_name='Canada by Citizenship',
-                     skiprows=range(20),
-                     skipfooter=2)
+from canada_data import load_clean_canada
+
+# the cleaned data is memory-mapped from a local snapshot; the choropleth needs 'Country' as a column
+df_can = load_clean_canada().reset_index()
 
 print('Data downloaded and read into a dataframe!')
 
@@ -265,18 +261,6 @@ print(df_can.shape)
 # In[44]:
 
 
-# Removing unnecessary columns (eg. REG) 
-df_can.drop(['AREA','REG','DEV','Type','Coverage'], axis=1, inplace=True)
-
-# Renaming the columns so that they make sense
-df_can.rename(columns={'OdName':'Country', 'AreaName':'Continent','RegName':'Region'}, inplace=True)
-
-# for sake of consistency, making all column labels of type string
-df_can.columns = list(map(str, df_can.columns))
-
-# add total column
-df_can['Total'] = df_can.sum(axis=1)
-
 # years that will be used in this lesson - useful for plotting later on
 years = list(map(str, range(1980, 2014)))
 print ('data dimensions:', df_can.shape)
@@ -329,14 +313,21 @@ import folium
 # Load the GeoJSON file for world map
 world_geo = 'C:\\Users\\Sudharshan Ravikumar\\Downloads\\world_countries.json'
 
+from country_index import CountryIndex, GeoJoin
+
+# matching the GeoJSON country names to the UN names once (aliases such as 'Viet Nam' -> 'Vietnam' included);
+# countries that still do not match are reported here instead of silently staying blank on the map
+geo_join = GeoJoin(CountryIndex(df_can['Country']), world_geo)
+df_geo = geo_join.frame(df_can['Total'])
+
 # Create a plain world map
 world_map = folium.Map(location=[0, 0], zoom_start=2)
 
 # Generate choropleth map using the total immigration of each country to Canada from 1980 to 2013
 folium.Choropleth(
     geo_data=world_geo,
-    data=df_can,
-    columns=['Country', 'Total'],
+    data=df_geo,
+    columns=['name', 'Total'],
     key_on='feature.properties.name',
     fill_color='YlOrRd', 
     fill_opacity=0.7, 
@@ -374,8 +365,8 @@ world_map = folium.Map(location=[0, 0], zoom_start=2)
 # Create the choropleth map with threshold scale
 folium.Choropleth(
     geo_data=world_geo,
-    data=df_can,
-    columns=['Country', 'Total'],
+    data=df_geo,
+    columns=['name', 'Total'],
     key_on='feature.properties.name',
     threshold_scale=threshold_scale,
     fill_color='YlOrRd', 
@@ -0,0 +1,111 @@
+"""Pre-aggregated continent / region / development-group x year sums.
+
+Breakdowns such as ``df_can.groupby('Continent').sum()`` rescan every country
+row for each chart. ``AggregateCube`` sums the year block once per
+Continent x Region x DevName combination that occurs, so roll-ups (``by``)
+and slices (``where``) are answered by summing a few dozen cells instead of
+the base table.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+DIMENSIONS = ('Continent', 'Region', 'DevName')
+
+
+class AggregateCube:
+    """Year sums of a ``YearMatrix`` over every combination of ``dimensions`` that occurs.
+
+    Only the combinations some country belongs to are stored (a few dozen of
+    the thousands in the full product): ``cells`` holds their flat positions
+    in the product of the ``levels``, ``sums`` their ``(cells, years)`` year
+    sums and ``countries`` how many countries each one covers. The cube
+    subscribes to the matrix; an appended year costs one ``bincount`` written
+    into a geometrically grown buffer, as ``YearMatrix.append_year`` does.
+    """
+
+    def __init__(self, matrix, dimensions=DIMENSIONS):
+        self.matrix = matrix
+        self.dimensions = tuple(dimensions)
+
+        codes, self.levels = [], {}
+        for dimension in self.dimensions:
+            dimension_codes, levels = pd.factorize(matrix.attributes[dimension], sort=True)
+            codes.append(dimension_codes)
+            self.levels[dimension] = list(levels)
+        self._shape = tuple(len(self.levels[dimension]) for dimension in self.dimensions)
+        self.cells, self._rows = np.unique(np.ravel_multi_index(codes, self._shape), return_inverse=True)
+        self.countries = np.bincount(self._rows, minlength=len(self.cells))
+
+        years = len(matrix.years)
+        self._buffer = np.zeros((len(self.cells), years), dtype=np.int64)
+        np.add.at(self._buffer, self._rows, matrix.values)
+        self.sums = self._buffer[:, :years]
+        matrix.subscribe(self._append)
+
+    def _append(self, year, counts):
+        n = self.sums.shape[1]
+        if n == self._buffer.shape[1]:
+            buffer = np.zeros((len(self.cells), max(2 * n, n + 1)), dtype=np.int64)
+            buffer[:, :n] = self.sums
+            self._buffer = buffer
+        self._buffer[:, n] = np.bincount(self._rows, weights=counts, minlength=len(self.cells))
+        self.sums = self._buffer[:, :n + 1]
+
+    def _axis(self, dimension):
+        try:
+            return self.dimensions.index(dimension)
+        except ValueError:
+            raise KeyError('{!r} is not a cube dimension ({})'.format(dimension, ', '.join(self.dimensions)))
+
+    def query(self, by=(), where=None, years=None, total=True):
+        """Sum the cube down to the ``by`` dimensions.
+
+        ``by`` is a dimension name or a sequence of them; every other dimension
+        is rolled up. ``where`` maps dimensions to a value or list of values to
+        keep, e.g. ``{'Continent': 'Asia'}``. ``years`` restricts the columns.
+        Returns a DataFrame indexed by the ``by`` levels (combinations that no
+        country belongs to are left out) with one column per year plus 'Total'.
+        """
+        if isinstance(by, str):
+            by = (by,)
+        by = tuple(by)
+
+        coords = list(np.unravel_index(self.cells, self._shape))
+        keep = np.ones(len(self.cells), dtype=bool)
+        levels = dict(self.levels)
+        for dimension, values in (where or {}).items():
+            axis = self._axis(dimension)
+            values = [values] if isinstance(values, str) else list(values)
+            # recode the dimension to positions in ``values``, so the result follows the order asked for
+            lookup = np.full(len(levels[dimension]), -1)
+            lookup[[levels[dimension].index(value) for value in values]] = np.arange(len(values))
+            coords[axis] = lookup[coords[axis]]
+            keep &= coords[axis] >= 0
+            levels[dimension] = values
+
+        sums = self.sums[keep]
+        year_labels = list(self.matrix.years)
+        if years is not None:
+            year_labels = [str(year) for year in years]
+            sums = sums[:, [self.matrix.col[year] for year in year_labels]]
+
+        if by:
+            shape = tuple(len(levels[dimension]) for dimension in by)
+            groups = np.ravel_multi_index([coords[self._axis(dimension)][keep] for dimension in by], shape)
+            present, inverse = np.unique(groups, return_inverse=True)
+            data = np.zeros((len(present), len(year_labels)), dtype=np.int64)
+            np.add.at(data, inverse, sums)
+            index = pd.MultiIndex.from_arrays([np.asarray(levels[dimension], dtype=object)[positions] for dimension,
+                                               positions in zip(by, np.unravel_index(present, shape))], names=list(by))
+            if len(by) == 1:
+                index = index.get_level_values(0)
+        else:
+            data = sums.sum(axis=0, keepdims=True)
+            index = pd.Index(['All'])
+
+        df = pd.DataFrame(data, index=index, columns=year_labels)
+        if total:
+            df['Total'] = df.sum(axis=1)
+        return df
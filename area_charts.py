@@ -0,0 +1,139 @@
+"""Area charts from precomputed band boundaries, downsampled for long series.
+
+``DataFrame.plot(kind='area')`` hands every full series to ``fill_between``,
+which stacks and builds the polygons itself, point by point. ``StackedArea``
+computes the lower and upper boundary of every band once, with one cumulative
+sum over the ``(series, points)`` block (positive and negative series stacked
+separately, as pandas does).
+
+For long series (monthly or daily data) each band is reduced with
+largest-triangle-three-buckets (LTTB) before the polygons are built. The
+points kept for the bands are merged, so neighbouring bands still share their
+boundary exactly; the picture keeps its peaks and dips while the polygons,
+and so vector files, stay small.
+"""
+
+import matplotlib as mpl
+import matplotlib.dates as mdates
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.patches import Patch
+
+
+# series longer than this are downsampled before drawing
+DEFAULT_THRESHOLD = 1000
+
+
+def lttb(x, y, threshold):
+    """Indices of the ``threshold`` points that largest-triangle-three-buckets keeps.
+
+    ``y`` is one series or a ``(series, points)`` block sharing ``x``; a
+    block is reduced in a single pass over the buckets and gives one row of
+    indices per series. The first and last points are always kept.
+    """
+    single = np.ndim(y) == 1
+    x = np.asarray(x, dtype=float)
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    n, length = y.shape
+    if threshold >= length or threshold < 3:
+        index = np.tile(np.arange(length), (n, 1))
+        return index[0] if single else index
+
+    # bucket i covers points [edges[i], edges[i + 1]); the first and last points are buckets of their own
+    edges = (np.arange(threshold - 1) * (length - 2) / (threshold - 2)).astype(np.intp) + 1
+    edges[-1] = length - 1
+    rows = np.arange(n)
+    index = np.empty((n, threshold), dtype=np.intp)
+    index[:, 0], index[:, -1] = 0, length - 1
+
+    a = np.zeros(n, dtype=np.intp)
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        # the third corner is the average point of the next bucket (or the last point)
+        following = slice(stop, edges[i + 2]) if i + 2 < len(edges) else slice(length - 1, length)
+        cx, cy = x[following].mean(), y[:, following].mean(axis=1)
+        ax, ay = x[a], y[rows, a]
+        area = np.abs((ax - cx)[:, None] * (y[:, start:stop] - ay[:, None])
+                      - (ax[:, None] - x[start:stop]) * (cy - ay)[:, None])
+        a = start + area.argmax(axis=1)
+        index[:, i + 1] = a
+    return index[0] if single else index
+
+
+def _polygons(x, lower, upper):
+    xs = np.concatenate([x, x[::-1]])
+    return [np.column_stack([xs, np.concatenate([top, bottom[::-1]])]) for top, bottom in zip(upper, lower)]
+
+
+class StackedArea:
+    """The ``lower`` and ``upper`` boundaries of one band per series over ``x``.
+
+    ``block`` has one row per series; missing values count as 0. With
+    ``stacked=False`` every band starts at 0, otherwise each series must be
+    all positive or all negative.
+    """
+
+    def __init__(self, x, block, labels=None, stacked=True):
+        self.x = np.asarray(x)
+        block = np.nan_to_num(np.atleast_2d(np.asarray(block, dtype=float)))
+        self.labels = list(range(len(block))) if labels is None else list(labels)
+        self.stacked = stacked
+
+        if stacked:
+            positive = (block >= 0).all(axis=1)
+            if not (positive | (block <= 0).all(axis=1)).all():
+                raise ValueError('when stacked, each series must be either all positive or all negative')
+            upper = np.where(positive[:, None], np.cumsum(np.where(positive[:, None], block, 0), axis=0),
+                             np.cumsum(np.where(positive[:, None], 0, block), axis=0))
+            self.lower, self.upper = upper - block, upper
+        else:
+            self.lower, self.upper = np.zeros_like(block), block
+
+    @classmethod
+    def from_frame(cls, df, stacked=True):
+        """Bands for the columns of ``df``, over its index (e.g. ``YearMatrix.frame``)."""
+        return cls(df.index.to_numpy(), df.to_numpy().T, list(df.columns), stacked)
+
+    def _numeric_x(self):
+        if np.issubdtype(self.x.dtype, np.datetime64):
+            return mdates.date2num(self.x)
+        return self.x.astype(float)
+
+    def points(self, threshold=DEFAULT_THRESHOLD):
+        """``(x, lower, upper)`` with at most about ``threshold`` points kept per band.
+
+        The kept points are the union of every band's LTTB selection (on its
+        upper boundary), so ``x`` stays shared by all bands.
+        """
+        x = self._numeric_x()
+        if threshold is None or len(x) <= threshold:
+            return x, self.lower, self.upper
+        index = np.unique(lttb(x, self.upper, threshold))
+        return x[index], self.lower[:, index], self.upper[:, index]
+
+    def polygons(self, threshold=DEFAULT_THRESHOLD):
+        """One closed ``(points, 2)`` vertex array per band: along the top, back along the bottom."""
+        return _polygons(*self.points(threshold))
+
+    def draw(self, ax, alpha=0.5, colors=None, threshold=DEFAULT_THRESHOLD, legend=True, linewidth=None):
+        """Fill every band and outline its top, like ``plot(kind='area')``; returns the ``PolyCollection``.
+
+        All bands are one ``PolyCollection`` and all outlines one
+        ``LineCollection``.
+        """
+        if colors is None:
+            cycle = mpl.rcParams['axes.prop_cycle'].by_key()['color']
+            colors = [cycle[i % len(cycle)] for i in range(len(self.labels))]
+        x, lower, upper = self.points(threshold)
+        bands = ax.add_collection(PolyCollection(_polygons(x, lower, upper), facecolors=colors, edgecolors='none', alpha=alpha))
+        ax.add_collection(LineCollection([np.column_stack([x, top]) for top in upper], colors=colors, alpha=alpha,
+                                         linewidths=linewidth or mpl.rcParams['lines.linewidth']))
+        if np.issubdtype(self.x.dtype, np.datetime64):
+            ax.xaxis_date()
+        ax.set_xlim(x[0], x[-1])
+        ax.autoscale_view(scalex=False)
+        if (lower >= 0).all():
+            ax.set_ylim(bottom=0)
+        if legend:
+            ax.legend([Patch(facecolor=color, alpha=alpha) for color in colors], [str(label) for label in self.labels])
+        return bands
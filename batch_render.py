@@ -0,0 +1,184 @@
+"""Render the project charts headlessly, spread over a process pool.
+
+The scripts are notebook exports that need an IPython kernel
+(``get_ipython()``, ``plt.show()``). This module renders the same charts (see
+``charts.CHARTS``) to PNG or SVG files with the Agg backend, with one command:
+
+    python batch_render.py --out charts --format svg --jobs 4
+
+Every worker memory-maps the same cleaned snapshot (``canada_data``), so the
+data is parsed once and its pages are shared between the processes. Rendered
+images go through a ``FigureCache``: a chart whose data slice and parameters
+are unchanged since an earlier run is copied from the cache instead of drawn.
+
+``--countries`` renders one trend chart per country instead (all of them, or
+the ones named), into ``OUT/countries``. Each worker draws its share of the
+countries with one ``line_charts.LineChartTemplate``, so only the lines and
+title change from chart to chart:
+
+    python batch_render.py --out charts --countries
+    python batch_render.py --out charts --countries Haiti Iceland
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import numpy as np
+
+import charts
+from canada_data import CANADA_URL, DEFAULT_MAX_AGE, snapshot_canada
+from figure_cache import DEFAULT_MAX_BYTES, FigureCache
+from line_charts import render_country_lines
+
+
+FORMATS = ('png', 'svg')
+
+# per-process state, set up once by _init_worker
+_data = None
+_cache = None
+
+
+def _init_worker(source, cache_dir, max_age, figure_cache, figure_cache_bytes):
+    global _data, _cache
+    _data = charts.ChartData.load(source, cache_dir, max_age=max_age)
+    _cache = None if figure_cache is False else FigureCache(figure_cache, figure_cache_bytes)
+
+
+def render(name, out_dir, fmt='png', data=None, dpi=100, cache=None):
+    """Render chart ``name`` to ``out_dir/name.fmt`` and return the file path.
+
+    With a ``FigureCache`` the image is only drawn when no identical chart
+    (same drawing code, data slice, parameters, format and dpi) is cached.
+    """
+    chart = charts.CHARTS[name]
+    selection = chart.select(data or _data)
+    path = os.path.join(out_dir, '{}.{}'.format(name, fmt))
+    cache = cache or _cache
+    if cache is None:
+        chart.draw(selection, **chart.params).savefig(path, format=fmt, dpi=dpi)
+    else:
+        with open(path, 'wb') as f:
+            f.write(cache.render(chart.draw, selection, chart.params, fmt, dpi))
+    return path
+
+
+def _render_task(task):
+    name, out_dir, fmt, dpi = task
+    start = time.perf_counter()
+    path = render(name, out_dir, fmt, dpi=dpi)
+    return name, path, time.perf_counter() - start
+
+
+def render_all(names=None, out_dir='charts', fmt='png', processes=None, source=CANADA_URL, cache_dir=None,
+               max_age=DEFAULT_MAX_AGE, dpi=100, figure_cache=None, figure_cache_bytes=DEFAULT_MAX_BYTES):
+    """Render ``names`` (every registered chart by default) and return ``{name: path}``.
+
+    ``processes`` is the pool size (``os.cpu_count()`` by default); with
+    ``processes=1`` everything is rendered in this process. ``figure_cache``
+    is the image cache directory (``FigureCache``'s default when None), or
+    False to always draw.
+    """
+    if fmt not in FORMATS:
+        raise ValueError('unsupported format {!r}, expected one of {}'.format(fmt, ', '.join(FORMATS)))
+    names = list(charts.CHARTS) if names is None else list(names)
+    unknown = [name for name in names if name not in charts.CHARTS]
+    if unknown:
+        raise KeyError('unknown charts: {}'.format(', '.join(unknown)))
+    os.makedirs(out_dir, exist_ok=True)
+
+    # build the snapshot here so the workers only ever map it
+    snapshot_canada(source, cache_dir, max_age=max_age)
+
+    tasks = [(name, out_dir, fmt, dpi) for name in names]
+    processes = min(processes or os.cpu_count() or 1, len(tasks)) or 1
+    initargs = (source, cache_dir, max_age, figure_cache, figure_cache_bytes)
+    if processes == 1:
+        _init_worker(*initargs)
+        results = map(_render_task, tasks)
+        return {name: path for name, path, _ in results}
+
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=initargs) as pool:
+        return {name: path for name, path, _ in pool.imap_unordered(_render_task, tasks)}
+
+
+def _country_task(task):
+    countries, out_dir, fmt, dpi = task
+    return render_country_lines(_data.matrix, countries, out_dir, fmt, dpi=dpi)
+
+
+def render_countries(countries=None, out_dir='charts', fmt='png', processes=None, source=CANADA_URL, cache_dir=None,
+                     max_age=DEFAULT_MAX_AGE, dpi=100):
+    """Render one trend chart per country (every country by default) into ``out_dir``; returns the paths.
+
+    The countries are split into chunks over ``processes`` workers, and each
+    chunk is drawn with ``render_country_lines``. These charts bypass the
+    ``FigureCache``: redrawing one costs less than hashing its key.
+    """
+    if fmt not in FORMATS:
+        raise ValueError('unsupported format {!r}, expected one of {}'.format(fmt, ', '.join(FORMATS)))
+    snapshot_canada(source, cache_dir, max_age=max_age)
+    initargs = (source, cache_dir, max_age, False, 0)
+    _init_worker(*initargs)
+    countries = list(_data.matrix.countries) if countries is None else list(countries)
+    unknown = [country for country in countries if country not in _data.matrix.row]
+    if unknown:
+        raise KeyError('unknown countries: {}'.format(', '.join(unknown)))
+    os.makedirs(out_dir, exist_ok=True)
+
+    processes = min(processes or os.cpu_count() or 1, len(countries)) or 1
+    # a few chunks per worker keeps the pool busy when some countries take longer
+    chunks = [list(chunk) for chunk in np.array_split(np.array(countries, dtype=object), processes * 4) if len(chunk)]
+    tasks = [(chunk, out_dir, fmt, dpi) for chunk in chunks]
+    if processes == 1:
+        return [path for paths in map(_country_task, tasks) for path in paths]
+
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=initargs) as pool:
+        return [path for paths in pool.imap(_country_task, tasks) for path in paths]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render the immigration charts to image files.')
+    parser.add_argument('charts', nargs='*', help='charts to render (default: all)')
+    parser.add_argument('--out', default='charts', help='output directory (default: %(default)s)')
+    parser.add_argument('--format', default='png', choices=FORMATS, help='image format (default: %(default)s)')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--dpi', type=int, default=100, help='resolution of PNG output (default: %(default)s)')
+    parser.add_argument('--source', default=CANADA_URL, help='Canada.xlsx URL or path')
+    parser.add_argument('--cache-dir', default=None, help='data cache directory')
+    parser.add_argument('--figure-cache', default=None, help='rendered image cache directory')
+    parser.add_argument('--figure-cache-mb', type=int, default=DEFAULT_MAX_BYTES // 2 ** 20,
+                        help='size limit of the image cache in MiB (default: %(default)s)')
+    parser.add_argument('--no-figure-cache', action='store_true', help='always draw every chart')
+    parser.add_argument('--list', action='store_true', help='list the available charts and exit')
+    parser.add_argument('--countries', nargs='*', metavar='COUNTRY',
+                        help='render one trend chart per country (all when none are named) into OUT/countries')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(charts.CHARTS))
+        return 0
+
+    start = time.perf_counter()
+    if args.countries is not None:
+        out_dir = os.path.join(args.out, 'countries')
+        paths = render_countries(args.countries or None, out_dir, args.format, args.jobs, args.source,
+                                 args.cache_dir, dpi=args.dpi)
+        print('rendered {} country charts to {} in {:.1f}s'.format(len(paths), out_dir, time.perf_counter() - start))
+        return 0
+
+    paths = render_all(args.charts or None, args.out, args.format, args.jobs, args.source, args.cache_dir,
+                       dpi=args.dpi, figure_cache=False if args.no_figure_cache else args.figure_cache,
+                       figure_cache_bytes=args.figure_cache_mb * 2 ** 20)
+    print('rendered {} charts to {} in {:.1f}s'.format(len(paths), args.out, time.perf_counter() - start))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Bitmap index over the categorical country attributes.
+
+Filters such as ``(df_can['Continent'] == 'Asia') & (df_can['Region'] ==
+'Southern Asia')`` compare every string on every call. ``BitmapIndex`` keeps one
+packed bitmap per (column, value) pair, so a filter is a few word-wide AND / OR
+/ NOT operations, and the row positions of filters that are used again are
+cached. Positions index straight into ``YearMatrix.values``.
+"""
+
+import numpy as np
+
+
+class Filter:
+    """A boolean expression over ``BitmapIndex`` bitmaps.
+
+    Build leaves with ``index.eq(column, value)`` / ``index.isin(column, values)``
+    and combine them with ``&``, ``|`` and ``~``. Filters are hashable and
+    compare by structure, which is what the result cache is keyed on.
+    """
+
+    def __init__(self, op, *args):
+        self.op = op
+        self.args = args
+
+    def __and__(self, other):
+        return Filter('and', self, other)
+
+    def __or__(self, other):
+        return Filter('or', self, other)
+
+    def __invert__(self):
+        return Filter('not', self)
+
+    def __eq__(self, other):
+        return isinstance(other, Filter) and (self.op, self.args) == (other.op, other.args)
+
+    def __hash__(self):
+        return hash((self.op, self.args))
+
+    def __repr__(self):
+        if self.op == 'eq':
+            return '({} == {!r})'.format(*self.args)
+        if self.op == 'none':
+            return '({} in [])'.format(*self.args)
+        if self.op == 'not':
+            return '~{!r}'.format(self.args[0])
+        return '({!r} {} {!r})'.format(self.args[0], '&' if self.op == 'and' else '|', self.args[1])
+
+
+class BitmapIndex:
+    """Packed bitmaps for every value of the given attribute columns.
+
+    ``BitmapIndex(matrix)`` indexes all of ``matrix.attributes`` (Continent,
+    Region, DevName); bitmaps are ``np.packbits`` arrays with one bit per row.
+    """
+
+    def __init__(self, matrix, columns=None, cache_size=256):
+        self.matrix = matrix
+        self.n = len(matrix.countries)
+        self.cache_size = cache_size
+        self._cache = {}
+        self._bitmaps = {}
+        for column in columns or matrix.attributes:
+            values = matrix.attributes[column]
+            levels, codes = np.unique(values.astype(str), return_inverse=True)
+            for code, level in enumerate(levels):
+                self._bitmaps[column, level] = np.packbits(codes == code)
+        self._all = np.packbits(np.ones(self.n, dtype=bool))
+
+    def values(self, column):
+        """The distinct values indexed for ``column``."""
+        return [value for name, value in self._bitmaps if name == column]
+
+    def _check(self, column):
+        if not any(name == column for name, _ in self._bitmaps):
+            raise KeyError('{!r} is not indexed'.format(column))
+
+    def eq(self, column, value):
+        """Filter for rows whose ``column`` equals ``value``."""
+        self._check(column)
+        return Filter('eq', column, value)
+
+    def isin(self, column, values):
+        """Filter for rows whose ``column`` is any of ``values``; no values match no rows."""
+        values = list(values)
+        if not values:
+            self._check(column)
+            return Filter('none', column)
+        result = self.eq(column, values[0])
+        for value in values[1:]:
+            result = result | self.eq(column, value)
+        return result
+
+    def bitmap(self, expression):
+        """Evaluate ``expression`` to its packed bitmap."""
+        if expression.op == 'eq':
+            empty = np.zeros_like(self._all)
+            return self._bitmaps.get(expression.args, empty)
+        if expression.op == 'none':
+            return np.zeros_like(self._all)
+        if expression.op == 'not':
+            # clear the padding bits past the last row so counts stay right
+            return np.bitwise_and(np.invert(self.bitmap(expression.args[0])), self._all)
+        left, right = (self.bitmap(arg) for arg in expression.args)
+        return np.bitwise_and(left, right) if expression.op == 'and' else np.bitwise_or(left, right)
+
+    def rows(self, expression):
+        """Row positions (into the year matrix) matching ``expression``, cached per expression."""
+        rows = self._cache.get(expression)
+        if rows is None:
+            rows = np.flatnonzero(np.unpackbits(self.bitmap(expression), count=self.n))
+            rows.flags.writeable = False
+            if len(self._cache) >= self.cache_size:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[expression] = rows
+        return rows
+
+    def count(self, expression):
+        """Number of rows matching ``expression``."""
+        return int(np.unpackbits(self.bitmap(expression), count=self.n).sum())
+
+    def countries(self, expression):
+        """Names of the countries matching ``expression``."""
+        return [self.matrix.countries[row] for row in self.rows(expression)]
@@ -0,0 +1,91 @@
+"""Box-plot statistics for every column of a block, computed in one pass.
+
+``df.plot(kind='box')`` and ``df.describe()`` each work through the columns
+one at a time (matplotlib's ``boxplot_stats`` loops over them in Python), and
+the scripts call both for the same frames. ``BoxStats`` computes quartiles,
+whiskers, outliers and the ``describe()`` summary for all columns with one
+``np.percentile`` call over the ``(values, columns)`` block, and draws the
+boxes with ``Axes.bxp`` from those numbers.
+"""
+
+import inspect
+
+import matplotlib as mpl
+import numpy as np
+import pandas as pd
+from matplotlib.axes import Axes
+
+
+# matplotlib 3.10 replaced bxp's ``vert`` flag with ``orientation``
+_ORIENTATION = 'orientation' in inspect.signature(Axes.bxp).parameters
+
+
+class BoxStats:
+    """Quartiles, whiskers and fliers of each column of ``data``, as ``boxplot`` computes them.
+
+    ``data`` is a DataFrame (one box per column, like ``df.plot(kind='box')``)
+    or a 2D array of ``(values, columns)``. ``whis`` is the whisker reach in
+    IQRs. Missing values are ignored.
+    """
+
+    def __init__(self, data, whis=1.5, labels=None):
+        if isinstance(data, pd.DataFrame):
+            labels = list(data.columns) if labels is None else labels
+            data = data.to_numpy()
+        block = np.asarray(data, dtype=float)
+        block = block.reshape(len(block), -1)
+        self.labels = list(range(block.shape[1])) if labels is None else list(labels)
+
+        valid = ~np.isnan(block)
+        percentile = np.percentile if valid.all() else np.nanpercentile
+        self.count = valid.sum(axis=0)
+        self.q1, self.med, self.q3 = percentile(block, [25, 50, 75], axis=0)
+        self.mean = np.nanmean(block, axis=0)
+        self.std = np.nanstd(block, axis=0, ddof=1)
+        self.min, self.max = np.nanmin(block, axis=0), np.nanmax(block, axis=0)
+        self.iqr = self.q3 - self.q1
+
+        # whiskers reach the most extreme values within whis * IQR of the box, but never inside it
+        low, high = self.q1 - whis * self.iqr, self.q3 + whis * self.iqr
+        self.whislo = np.minimum(np.where(valid & (block >= low), block, np.inf).min(axis=0), self.q1)
+        self.whishi = np.maximum(np.where(valid & (block <= high), block, -np.inf).max(axis=0), self.q3)
+
+        # fliers of all columns from one mask, split per column
+        outside = valid & ((block < self.whislo) | (block > self.whishi))
+        columns, rows = np.nonzero(outside.T)
+        self.fliers = np.split(block[rows, columns], np.cumsum(np.bincount(columns, minlength=block.shape[1]))[:-1])
+
+        # notch limits, as boxplot_stats computes them without bootstrapping
+        half = 1.57 * self.iqr / np.sqrt(np.maximum(self.count, 1))
+        self.cilo, self.cihi = self.med - half, self.med + half
+
+    def stats(self):
+        """The statistics as the list of dicts ``Axes.bxp`` takes."""
+        return [{'label': label, 'mean': mean, 'med': med, 'q1': q1, 'q3': q3, 'iqr': iqr, 'cilo': cilo,
+                 'cihi': cihi, 'whislo': whislo, 'whishi': whishi, 'fliers': fliers}
+                for label, mean, med, q1, q3, iqr, cilo, cihi, whislo, whishi, fliers
+                in zip(self.labels, self.mean, self.med, self.q1, self.q3, self.iqr, self.cilo, self.cihi,
+                       self.whislo, self.whishi, self.fliers)]
+
+    def describe(self):
+        """The same table as ``df.describe()``, from the statistics already computed."""
+        return pd.DataFrame([self.count, self.mean, self.std, self.min, self.q1, self.med, self.q3, self.max],
+                            index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'],
+                            columns=self.labels).astype(float)
+
+    def draw(self, ax, vert=True, color=None, **bxp_kwargs):
+        """Draw one box per column on ``ax`` with ``Axes.bxp``, colored like ``plot(kind='box')``.
+
+        ``color`` colors boxes, whiskers, caps and medians alike; by default
+        they follow the style's color cycle as in pandas. Returns the dict of
+        artists from ``bxp``.
+        """
+        cycle = mpl.rcParams['axes.prop_cycle'].by_key()['color']
+        line, median = (color, color) if color is not None else (cycle[0], cycle[2 % len(cycle)])
+        for key, value in (('boxprops', line), ('whiskerprops', line), ('capprops', line), ('medianprops', median)):
+            bxp_kwargs.setdefault(key, {}).setdefault('color', value)
+        if _ORIENTATION:
+            bxp_kwargs['orientation'] = 'vertical' if vert else 'horizontal'
+        else:
+            bxp_kwargs['vert'] = vert
+        return ax.bxp(self.stats(), **bxp_kwargs)
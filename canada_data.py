@@ -0,0 +1,285 @@
+"""Cached loading of the UN 'Canada by Citizenship' immigration workbook.
+
+Every project script starts from the same workbook. Instead of downloading and
+parsing it on each run, the raw file is stored under its SHA-256 digest and the
+parsed frame is pickled next to it, so repeat runs skip both the network fetch
+and the openpyxl parse until the source content actually changes.
+
+The cleaned frame the charts work from is additionally written once as a
+snapshot: the 1980 - 2013 counts as one int32 ``.npy`` block plus a small JSON
+file with the country names and the text columns. Loading it memory-maps the
+block, so start-up is a few milliseconds and concurrent processes share pages.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import urllib.error
+import urllib.request
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+CANADA_URL = ('https://s3-api.us-geo.objectstorage.softlayer.net/cf-courses-data/'
+              'CognitiveClass/DV0101EN/labs/Data_Files/Canada.xlsx')
+
+# where workbooks and parsed frames are kept; override with $CANADA_CACHE_DIR
+CACHE_DIR = os.environ.get('CANADA_CACHE_DIR',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+
+# seconds a downloaded workbook is trusted before the server is asked again
+DEFAULT_MAX_AGE = 24 * 60 * 60
+
+# bump whenever the read_excel arguments or clean_canada() change so old caches are ignored
+PARSE_VERSION = 1
+
+# years covered by the dataset, as the string column labels used after cleaning
+YEARS = list(map(str, range(1980, 2014)))
+
+
+def _is_url(source):
+    return source.startswith(('http://', 'https://', 'ftp://'))
+
+
+def _atomic_write(path, write):
+    # write to a temporary name first so concurrent readers never see a partial file
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _write_bytes(path, data):
+    def write(tmp):
+        with open(tmp, 'wb') as f:
+            f.write(data)
+    _atomic_write(path, write)
+
+
+def _pointer_path(cache_dir, source):
+    if not _is_url(source):
+        source = os.path.abspath(source)
+    key = hashlib.sha1(source.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, 'source-{}.json'.format(key))
+
+
+def _read_pointer(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_pointer(path, pointer):
+    _write_bytes(path, json.dumps(pointer, indent=1).encode())
+
+
+def _blob_path(cache_dir, digest):
+    return os.path.join(cache_dir, 'canada-{}.xlsx'.format(digest))
+
+
+def _frame_path(cache_dir, digest):
+    return os.path.join(cache_dir, 'canada-{}-v{}.pkl'.format(digest, PARSE_VERSION))
+
+
+def _snapshot_path(cache_dir, digest):
+    return os.path.join(cache_dir, 'canada-{}-v{}-clean'.format(digest, PARSE_VERSION))
+
+
+def _discard(cache_dir, digest):
+    # drop the files of a workbook version that has been superseded
+    for path in (_blob_path(cache_dir, digest), _frame_path(cache_dir, digest)):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(_snapshot_path(cache_dir, digest), ignore_errors=True)
+
+
+def _store_blob(cache_dir, data):
+    digest = hashlib.sha256(data).hexdigest()
+    blob = _blob_path(cache_dir, digest)
+    if not os.path.exists(blob):
+        _write_bytes(blob, data)
+    return digest
+
+
+def fetch_workbook(source=CANADA_URL, cache_dir=None, max_age=DEFAULT_MAX_AGE, refresh=False):
+    """Return ``(path, digest)`` of a locally cached copy of the workbook.
+
+    ``source`` may be a URL or a local file path. URLs are re-validated with a
+    conditional request (ETag / Last-Modified) once ``max_age`` seconds have
+    passed, local files whenever their size or modification time changes.
+    ``refresh=True`` forces the check.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+
+    pointer_path = _pointer_path(cache_dir, source)
+    pointer = _read_pointer(pointer_path)
+    cached = pointer.get('digest')
+    if cached and not os.path.exists(_blob_path(cache_dir, cached)):
+        pointer, cached = {}, None
+
+    if _is_url(source):
+        if cached and not refresh and time.time() - pointer.get('checked', 0) < max_age:
+            return _blob_path(cache_dir, cached), cached
+
+        request = urllib.request.Request(source)
+        if cached and pointer.get('etag'):
+            request.add_header('If-None-Match', pointer['etag'])
+        if cached and pointer.get('last_modified'):
+            request.add_header('If-Modified-Since', pointer['last_modified'])
+        try:
+            with urllib.request.urlopen(request) as response:
+                data = response.read()
+                headers = response.headers
+        except urllib.error.HTTPError as err:
+            if err.code != 304:
+                raise
+            # not modified: keep the cached workbook, just remember we checked
+            pointer['checked'] = time.time()
+            _write_pointer(pointer_path, pointer)
+            return _blob_path(cache_dir, cached), cached
+        except urllib.error.URLError as err:
+            if not cached:
+                raise
+            warnings.warn('could not reach {} ({}); using the cached workbook'.format(source, err.reason))
+            return _blob_path(cache_dir, cached), cached
+
+        digest = _store_blob(cache_dir, data)
+        pointer = {'source': source,
+                   'digest': digest,
+                   'etag': headers.get('ETag'),
+                   'last_modified': headers.get('Last-Modified'),
+                   'checked': time.time()}
+    else:
+        stat = os.stat(source)
+        if (cached and not refresh and pointer.get('size') == stat.st_size
+                and pointer.get('mtime_ns') == stat.st_mtime_ns):
+            return _blob_path(cache_dir, cached), cached
+
+        with open(source, 'rb') as f:
+            digest = _store_blob(cache_dir, f.read())
+        pointer = {'source': os.path.abspath(source),
+                   'digest': digest,
+                   'size': stat.st_size,
+                   'mtime_ns': stat.st_mtime_ns,
+                   'checked': time.time()}
+
+    _write_pointer(pointer_path, pointer)
+    if cached and cached != digest:
+        _discard(cache_dir, cached)
+    return _blob_path(cache_dir, digest), digest
+
+
+def load_canada(source=CANADA_URL, cache_dir=None, max_age=DEFAULT_MAX_AGE, refresh=False):
+    """Load the raw 'Canada by Citizenship' sheet as a DataFrame.
+
+    Equivalent to the ``pd.read_excel(...)`` call the scripts used to make, but
+    served from the on-disk cache whenever the workbook content is unchanged.
+    Each call returns a fresh frame, so in-place edits never leak into the cache.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    path, digest = fetch_workbook(source, cache_dir, max_age=max_age, refresh=refresh)
+
+    frame_path = _frame_path(cache_dir, digest)
+    if os.path.exists(frame_path):
+        return pd.read_pickle(frame_path)
+
+    df = pd.read_excel(path,
+                       sheet_name='Canada by Citizenship',
+                       skiprows=range(20),
+                       skipfooter=2)
+    _atomic_write(frame_path, df.to_pickle)
+    return df
+
+
+def clean_canada(df):
+    """Return the cleaned frame every chart works from.
+
+    Drops the code columns, renames OdName/AreaName/RegName to
+    Country/Continent/Region, makes all column labels strings, indexes by
+    country and adds a 'Total' column summed over the year columns only.
+    """
+    df = df.drop(['AREA', 'REG', 'DEV', 'Type', 'Coverage'], axis=1)
+    df = df.rename(columns={'OdName': 'Country', 'AreaName': 'Continent', 'RegName': 'Region'})
+    df.columns = list(map(str, df.columns))
+    df = df.set_index('Country')
+
+    years = [column for column in df.columns if column.isdigit()]
+    df['Total'] = df[years].sum(axis=1)
+    return df
+
+
+def write_snapshot(df, path):
+    """Write a cleaned frame to the snapshot directory ``path``.
+
+    The year columns go to ``years.npy`` (int32, country-major), the totals to
+    ``total.npy`` and the country names plus text columns to ``meta.json``.
+    """
+    years = [column for column in df.columns if column.isdigit()]
+    text = [column for column in df.columns if column not in years and column != 'Total']
+    meta = {'countries': df.index.tolist(),
+            'years': years,
+            'columns': {column: df[column].tolist() for column in text}}
+
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    os.makedirs(tmp, exist_ok=True)
+    try:
+        np.save(os.path.join(tmp, 'years.npy'), np.ascontiguousarray(df[years].to_numpy(), dtype=np.int32))
+        np.save(os.path.join(tmp, 'total.npy'), df['Total'].to_numpy(dtype=np.int64))
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # another process published the same snapshot first
+            if not os.path.isdir(path):
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_snapshot(path, mmap_mode='r'):
+    """Return ``(meta, years, total)`` from a snapshot, memory-mapping the arrays."""
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    years = np.load(os.path.join(path, 'years.npy'), mmap_mode=mmap_mode)
+    total = np.load(os.path.join(path, 'total.npy'), mmap_mode=mmap_mode)
+    return meta, years, total
+
+
+def snapshot_canada(source=CANADA_URL, cache_dir=None, max_age=DEFAULT_MAX_AGE, refresh=False):
+    """Return the path of the cleaned snapshot for ``source``, building it if needed."""
+    cache_dir = cache_dir or CACHE_DIR
+    _, digest = fetch_workbook(source, cache_dir, max_age=max_age, refresh=refresh)
+
+    path = _snapshot_path(cache_dir, digest)
+    if not os.path.isdir(path):
+        write_snapshot(clean_canada(load_canada(source, cache_dir, max_age=max_age)), path)
+    return path
+
+
+def load_clean_canada(source=CANADA_URL, cache_dir=None, max_age=DEFAULT_MAX_AGE, refresh=False):
+    """Load the cleaned frame (see ``clean_canada``) from its memory-mapped snapshot.
+
+    The year columns are copy-on-write views onto the mapped file: processes
+    share its pages until one of them modifies a value, which then only
+    changes that process's private copy of the page.
+    """
+    path = snapshot_canada(source, cache_dir, max_age=max_age, refresh=refresh)
+    meta, years, total = load_snapshot(path, mmap_mode='c')
+
+    index = pd.Index(meta['countries'], name='Country')
+    df = pd.concat([pd.DataFrame(meta['columns'], index=index),
+                    pd.DataFrame(years, index=index, columns=meta['years'], copy=False)],
+                   axis=1)
+    df['Total'] = total
+    return df
@@ -0,0 +1,360 @@
+"""Every chart of the five project scripts as a reusable, headless definition.
+
+Each chart is registered as a ``Chart``: a ``select`` function that pulls the
+exact data slice the chart shows out of a ``ChartData`` bundle, a ``draw``
+function that turns that slice into a matplotlib ``Figure``, and the keyword
+parameters (figsize, colors, alpha, bins, ...) passed to ``draw``. Figures are
+created without pyplot, so they render under any backend and are garbage
+collected like ordinary objects. ``batch_render`` drives this registry.
+"""
+
+from collections import namedtuple
+
+import matplotlib as mpl
+import matplotlib.style
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from aggregate_cube import AggregateCube
+from area_charts import StackedArea
+from bar_charts import label_bars
+from box_stats import BoxStats
+from canada_data import CANADA_URL, DEFAULT_MAX_AGE
+from column_scales import ColumnScales
+from events import KINDS, annotate_events, detect_events
+from histograms import MultiHistogram
+from line_charts import draw_small_multiples
+from periods import period_table
+from rankings import RankingIndex
+from regression import draw_regression
+from shares import draw_shares, share_table
+from year_matrix import YearMatrix
+
+
+Chart = namedtuple('Chart', 'name select draw params')
+
+CHARTS = {}
+
+
+def register(name, select, draw, **params):
+    """Add a chart to ``CHARTS``; ``draw(select(data), **params)`` must return a Figure."""
+    if name in CHARTS:
+        raise ValueError('chart {!r} is already registered'.format(name))
+    CHARTS[name] = Chart(name, select, draw, params)
+    return CHARTS[name]
+
+
+class ChartData:
+    """The shared inputs of all charts: the year matrix and the indexes, scales and events derived from it."""
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.ranking = RankingIndex(matrix)
+        self.cube = AggregateCube(matrix)
+        self.scales = ColumnScales(matrix)
+        self._events = None
+        matrix.subscribe(self._append)
+
+    def _append(self, year, counts):
+        self._events = None
+
+    @property
+    def events(self):
+        """Spikes, dips and level shifts of every country (``detect_events``), found once and cached."""
+        if self._events is None:
+            self._events = detect_events(self.matrix)
+        return self._events
+
+    @classmethod
+    def load(cls, source=CANADA_URL, cache_dir=None, max_age=DEFAULT_MAX_AGE):
+        return cls(YearMatrix.load(source, cache_dir, max_age=max_age))
+
+
+def build(chart, data):
+    """Select the chart's data and draw it; returns the Figure."""
+    return chart.draw(chart.select(data), **chart.params)
+
+
+def _figure(figsize=None, ncols=1):
+    fig = Figure(figsize=figsize)
+    return fig, fig.subplots(1, ncols)
+
+
+def _label(ax, title=None, xlabel=None, ylabel=None, title_y=None):
+    if title is not None:
+        ax.set_title(title, y=title_y)
+    if xlabel is not None:
+        ax.set_xlabel(xlabel)
+    if ylabel is not None:
+        ax.set_ylabel(ylabel)
+
+
+# ---------------------------------------------------------------- data slices
+
+
+def year_totals(matrix, names=None):
+    """``DataFrame`` with 'year' and 'total' columns: the per-year sum over ``names`` (all countries by default)."""
+    block = matrix.values if names is None else matrix.block(names)
+    return pd.DataFrame({'year': matrix.year_numbers, 'total': block.sum(axis=0, dtype=np.int64)})
+
+
+def annotated(data, name, kinds=KINDS, top=None):
+    """One country's series and its ``top`` strongest events (all by default) of ``kinds``, from ``data.events``."""
+    events = data.events
+    events = events[(events['country'] == name) & events['kind'].isin(kinds)].head(top)
+    return data.matrix.frame([name])[name], events.reset_index(drop=True)
+
+
+def bubble_data(data, names, method='minmax'):
+    """The counts of ``names`` (years down) and their bubble weights, served from ``data.scales``."""
+    return data.matrix.frame(names), data.scales.normalize(names, method)
+
+
+def decade_sums(matrix, names, decades=(1980, 1990, 2000)):
+    """Per-decade sums for ``names``, one column per decade ('1980s', ...)."""
+    # one reduceat over the decades and any gaps between them, then only the decades asked for are kept
+    bounds = sorted(set(decades) | {start + 10 for start in decades})
+    return period_table(matrix, bounds, names=names)[['{}s'.format(start) for start in decades]]
+
+
+# ------------------------------------------------------------------- drawers
+
+
+def draw_line(df, title=None, xlabel=None, ylabel=None, figsize=None, text=None, labels=None, style='ggplot'):
+    # ``df`` may come with the events to annotate, as the pair from ``annotated``
+    df, events = df if isinstance(df, tuple) else (df, None)
+    with mpl.style.context(style):
+        fig, ax = _figure(figsize)
+        df.plot(kind='line', ax=ax)
+        _label(ax, title, xlabel, ylabel)
+        if text is not None:
+            ax.text(*text)
+        if events is not None:
+            annotate_events(ax, events, labels=labels)
+    return fig
+
+
+def draw_area(df, title=None, xlabel=None, ylabel=None, figsize=None, alpha=0.5, stacked=True, style='ggplot'):
+    with mpl.style.context(style):
+        fig, ax = _figure(figsize)
+        StackedArea.from_frame(df, stacked).draw(ax, alpha=alpha)
+        _label(ax, title, xlabel, ylabel)
+    return fig
+
+
+def draw_hist(df, title=None, xlabel=None, ylabel=None, figsize=None, bins=10, color=None, alpha=None,
+              stacked=False, margin=None, style='ggplot'):
+    # every column binned in one pass over shared edges, as plot(kind='hist') does; the xticks are the edges
+    frame = df.to_frame() if isinstance(df, pd.Series) else df
+    histogram = MultiHistogram.from_block(frame, bins)
+    colors = color if isinstance(color, (list, tuple)) else [color] * frame.shape[1]
+
+    with mpl.style.context(style):
+        fig, ax = _figure(figsize)
+        histogram.draw(ax, stacked=stacked, colors=colors, margin=margin, legend=isinstance(df, pd.DataFrame),
+                       alpha=alpha)
+        _label(ax, title, xlabel, ylabel)
+    return fig
+
+
+def draw_bar(series, title=None, xlabel=None, ylabel=None, figsize=None, rot=90, annotations=(), labels=None,
+             style='ggplot'):
+    # as in draw_line, events from ``annotated`` are pointed at; bars sit at positions, not years
+    series, events = series if isinstance(series, tuple) else (series, None)
+    with mpl.style.context(style):
+        fig, ax = _figure(figsize)
+        series.plot(kind='bar', rot=rot, ax=ax)
+        _label(ax, title, xlabel, ylabel)
+        for annotation in annotations:
+            ax.annotate(**annotation)
+        if events is not None:
+            annotate_events(ax, events, x='position', labels=labels)
+    return fig
+
+
+def draw_barh(series, title=None, xlabel=None, ylabel=None, figsize=None, color=None, labels=None,
+              style='ggplot'):
+    with mpl.style.context(style):
+        fig, ax = _figure(figsize)
+        series.plot(kind='barh', color=color, ax=ax)
+        _label(ax, title, xlabel, ylabel)
+        if labels is not None:
+            # value labels at the end of each bar ('inside', 'outside' or 'auto'), all in one collection
+            label_bars(ax, ax.containers[0], series.to_numpy(), position=labels)
+    return fig
+
+
+def draw_pie(table, title=None, figsize=None, colors=None, explode=None, labels=True, pctdistance=0.6,
+             legend=False, title_y=None, column='Total', style='ggplot'):
+    # ``table`` comes from shares.share_table, so the percentages are already computed
+    with mpl.style.context(style):
+        fig, ax = _figure(figsize)
+        draw_shares(ax, table, column, labels=labels, pctdistance=pctdistance, colors=colors, explode=explode)
+        _label(ax, title, title_y=title_y)
+        if legend:
+            ax.legend(labels=table.index, loc='upper left')
+    return fig
+
+
+def draw_box(df, title=None, xlabel=None, ylabel=None, figsize=None, color=None, vert=True, style='ggplot'):
+    with mpl.style.context(style):
+        fig, ax = _figure(figsize)
+        BoxStats(df).draw(ax, vert=vert, color=color)
+        _label(ax, title, xlabel, ylabel)
+    return fig
+
+
+def draw_box_and_line(df, box_title=None, line_title=None, figsize=None, style='ggplot'):
+    with mpl.style.context(style):
+        fig, (ax0, ax1) = _figure(figsize, ncols=2)
+        BoxStats(df).draw(ax0, vert=False, color='blue')
+        _label(ax0, box_title, 'Number of Immigrants', 'Countries')
+        df.plot(kind='line', ax=ax1)
+        _label(ax1, line_title, 'Years', 'Number of Immigrants')
+    return fig
+
+
+def draw_scatter(df, title=None, xlabel=None, ylabel=None, figsize=None, color=None, fit=False,
+                 fit_label_xy=None, style='ggplot'):
+    with mpl.style.context(style):
+        fig, ax = _figure(figsize)
+        df.plot(kind='scatter', x='year', y='total', color=color, ax=ax)
+        _label(ax, title, xlabel, ylabel)
+        if fit:
+            slope, intercept = np.polyfit(df['year'], df['total'], deg=1)
+            ax.plot(df['year'], slope * df['year'] + intercept, color='red')
+            ax.annotate('y={0:.0f} x + {1:.0f}'.format(slope, intercept), xy=fit_label_xy)
+    return fig
+
+
+def draw_bubble(bubbles, title=None, ylabel=None, figsize=None, colors=('green', 'blue'), xlim=None, scale=2000,
+                offset=10, style='ggplot'):
+    # ``bubbles`` is the (counts, weights) pair from ``bubble_data``; sizes are the weights scaled
+    df, weights = bubbles
+    with mpl.style.context(style):
+        fig, ax = _figure(figsize)
+        for country, color in zip(df.columns, colors):
+            ax.scatter(df.index, df[country], s=weights[country] * scale + offset, alpha=0.5, color=color)
+        if xlim is not None:
+            ax.set_xlim(xlim)
+        _label(ax, title, 'Year', ylabel)
+        ax.legend(list(df.columns), loc='upper left', fontsize='x-large')
+    return fig
+
+
+def draw_regplot(df, title=None, xlabel=None, ylabel=None, figsize=None, color=None, marker='o', size=None,
+                 band='analytic', n_boot=1000, seed=None):
+    # seaborn only provides the look of these charts, so it is imported lazily
+    import seaborn as sns
+
+    with sns.axes_style('whitegrid'), sns.plotting_context(font_scale=1.5):
+        fig = Figure(figsize=figsize)
+        ax = fig.subplots()
+        draw_regression(ax, df['year'], df['total'], color=color, marker=marker, band=band, n_boot=n_boot,
+                        seed=seed, scatter_kws=None if size is None else {'s': size})
+        ax.set(xlabel=xlabel, ylabel=ylabel)
+        ax.set_title(title)
+    return fig
+
+
+# --------------------------------------------------------------- the charts
+
+NORDIC = ['Denmark', 'Norway', 'Sweden']
+
+# 1-Filtering-&-LinePlotting
+
+register('line_haiti', lambda data: annotated(data, 'Haiti'), draw_line,
+         title='Immigration from Haiti', xlabel='Years', ylabel='Number of Immigrants',
+         labels={(2010, 2011): '2010 Earthquake'})
+register('line_india_china', lambda data: data.matrix.frame(['India', 'China']), draw_line,
+         title='Immigration from India & China', xlabel='Years', ylabel='Number of immigrants')
+register('line_top5', lambda data: data.matrix.frame(data.ranking.top(5)), draw_line,
+         title='Immigration Trend of Top 5 Countries', xlabel='Years', ylabel='Number of Immigrants',
+         figsize=(14, 8))
+register('small_multiples_all', lambda data: data.matrix.frame(data.ranking.top(len(data.matrix.countries))),
+         draw_small_multiples, title='Immigration to Canada by Country, 1980 - 2013')
+
+# 2-Area_Plots-&-Histograms-&-Bar_Charts
+
+register('area_top5', lambda data: data.matrix.frame(data.ranking.top(5)), draw_area,
+         title='Immigration Trend of Top 5 Countries', xlabel='Years', ylabel='Number of Immigrants',
+         figsize=(20, 10), alpha=0.25, stacked=False)
+register('area_top5_stacked', lambda data: data.matrix.frame(data.ranking.top(5)), draw_area,
+         title='Immigration Trend of Top 5 Countries', xlabel='Years', ylabel='Number of Immigrants',
+         figsize=(20, 10), alpha=0.35)
+register('area_bottom5_stacked', lambda data: data.matrix.frame(data.ranking.bottom(5)), draw_area,
+         title='Immigration Trend of Bottom 5 Countries', xlabel='Years', ylabel='Number of Immigrants',
+         figsize=(20, 10), alpha=0.45)
+register('area_bottom5', lambda data: data.matrix.frame(data.ranking.bottom(5)), draw_area,
+         title='Immigration Trend of Bottom 5 Countries', xlabel='Years', ylabel='Number of Immigrants',
+         figsize=(20, 10), alpha=0.55, stacked=False)
+register('hist_2013', lambda data: pd.Series(data.matrix.year(2013), name='2013'), draw_hist,
+         title='Histogram of Immigration from 195 countries in 2013', xlabel='Number of Immigrants',
+         ylabel='Number of Countries', figsize=(8, 5))
+register('hist_nordic', lambda data: data.matrix.frame(NORDIC), draw_hist,
+         title='Histogram of Immigration from Denmark, Norway, and Sweden from 1980 - 2013',
+         xlabel='Number of Immigrants', ylabel='Number of Years', figsize=(10, 6), bins=15,
+         color=['coral', 'darkslateblue', 'mediumseagreen'], stacked=True, margin=10)
+register('hist_greece_albania_bulgaria', lambda data: data.matrix.frame(['Greece', 'Albania', 'Bulgaria']), draw_hist,
+         title='Histogram of Immigration from Greece, Albania, and Bulgaria from 1980 - 2013',
+         xlabel='Number of Immigrants', ylabel='Number of Years', figsize=(10, 6), bins=15, alpha=0.35,
+         color=['coral', 'darkslateblue', 'mediumseagreen'])
+register('bar_iceland', lambda data: annotated(data, 'Iceland', kinds=['break']), draw_bar,
+         title='Icelandic Immigrants to Canada from 1980 to 2013', xlabel='Year', ylabel='Number of Immigrants',
+         figsize=(10, 6), labels={(2008, 2011): '2008 - 2011 Financial Crisis'})
+register('barh_top15',
+         lambda data: pd.Series(data.matrix.totals[data.ranking.top_rows(15)[::-1]],
+                                index=data.ranking.top(15)[::-1], name='Total'),
+         draw_barh, title='Top 15 Conuntries Contributing to the Immigration to Canada between 1980 - 2013',
+         xlabel='Number of Immigrants', figsize=(12, 12), color='steelblue', labels='inside')
+
+# 3-Pie_Charts-&-Box_Plots-&-Scatter_Plots
+
+register('pie_continents', lambda data: share_table(data.cube.query(by='Continent')),
+         draw_pie, title='Immigration to Canada by Continent [1980 - 2013]', figsize=(5, 6))
+register('pie_continents_exploded', lambda data: share_table(data.cube.query(by='Continent')),
+         draw_pie, title='Immigration to Canada by Continent [1980 - 2013]', figsize=(15, 6),
+         colors=['gold', 'yellowgreen', 'lightcoral', 'lightskyblue', 'lightgreen', 'pink'],
+         explode=[0.1, 0, 0, 0, 0.1, 0.1], labels=False, pctdistance=1.12, legend=True, title_y=1.12)
+register('pie_regions_top8',
+         lambda data: share_table(data.cube.query(by='Region'), top=8, sort=True),
+         draw_pie, title='Immigration to Canada by Region [1980 - 2013]', figsize=(10, 8), labels=False,
+         pctdistance=1.12, legend=True, title_y=1.05)
+register('box_japan', lambda data: data.matrix.frame(['Japan']), draw_box,
+         title='Box plot of Japanese Immigrants from 1980 - 2013', ylabel='Number of Immigrants', figsize=(8, 6))
+register('box_china_india', lambda data: data.matrix.frame(['China', 'India']), draw_box,
+         title='Box plot of Chinese and Indian Immigrants from 1980 - 2013', ylabel='Number of Immigrants',
+         figsize=(8, 6))
+register('box_china_india_horizontal', lambda data: data.matrix.frame(['China', 'India']), draw_box,
+         title='Box plots of Immigrants from China and India (1980 - 2013)', xlabel='Number of Immigrants',
+         figsize=(10, 7), color='blue', vert=False)
+register('box_line_china_india', lambda data: data.matrix.frame(['China', 'India']), draw_box_and_line,
+         box_title='Box Plots of Immigrants from China and India (1980 - 2013)',
+         line_title='Line Plots of Immigrants from China and India (1980 - 2013)', figsize=(20, 6))
+register('box_decades_top15', lambda data: decade_sums(data.matrix, data.ranking.top(15)), draw_box,
+         title='Immigration from top 15 countries for decades 80s, 90s and 2000s', figsize=(10, 6))
+register('scatter_total', lambda data: year_totals(data.matrix), draw_scatter,
+         title='Total Immigration to Canada from 1980 - 2013', xlabel='Year', ylabel='Number of Immigrants',
+         figsize=(10, 6), color='darkblue')
+register('scatter_total_fit', lambda data: year_totals(data.matrix), draw_scatter,
+         title='Total Immigration to Canada from 1980 - 2013', xlabel='Year', ylabel='Number of Immigrants',
+         figsize=(10, 6), color='darkblue', fit=True, fit_label_xy=(2000, 150000))
+register('scatter_nordic', lambda data: year_totals(data.matrix, NORDIC), draw_scatter,
+         title='Immigration from Denmark, Norway, and Sweden to Canada from 1980 - 2013', xlabel='Year',
+         ylabel='Number of Immigrants', figsize=(10, 6), color='darkblue')
+register('bubble_brazil_argentina', lambda data: bubble_data(data, ['Brazil', 'Argentina']), draw_bubble,
+         title='Immigration from Brazil and Argentina from 1980 - 2013', ylabel='Number of Immigrants',
+         figsize=(14, 8), xlim=(1975, 2015))
+register('bubble_china_india', lambda data: bubble_data(data, ['China', 'India']), draw_bubble,
+         title='Immigration from China and India from 1980 - 2013', ylabel='Number of Immigrants',
+         figsize=(14, 8), xlim=(1975, 2015))
+
+# 4-Regression_Plots
+
+register('regplot_total', lambda data: year_totals(data.matrix), draw_regplot,
+         title='Total Immigration to Canada from 1980 - 2013', xlabel='Year', ylabel='Total Immigration',
+         figsize=(15, 10), color='green', marker='+', size=200)
+register('regplot_nordic', lambda data: year_totals(data.matrix, NORDIC), draw_regplot,
+         title='Total Immigrationn from Denmark, Sweden, and Norway to Canada from 1980 - 2013',
+         xlabel='Year', ylabel='Total Immigration', figsize=(15, 10), color='green', marker='+', size=200)
@@ -0,0 +1,108 @@
+"""Per-country scaling statistics for bubble sizes, computed once for every column.
+
+The bubble plots of script 3 size each point by the country's count
+min-max normalized over the years, written out per country as
+``(s - s.min()) / (s.max() - s.min())``: four scans of the series for each of
+``norm_brazil``, ``norm_argentina``, ``norm_china`` and ``norm_india``.
+``ColumnScales`` takes the whole time-major block (``df_can_t``, i.e. years
+down and countries across) and computes min, max, mean and standard
+deviation of every column in one pass. The scaled block for each method
+(min-max, z-score or percentile rank) is built for all columns with one
+broadcast operation the first time it is asked for and cached, so bubble
+sizes for any pair of countries are a column lookup.
+
+Built from a ``YearMatrix`` it subscribes to the matrix: an appended year
+updates the statistics from the new row alone and drops the cached scaled
+blocks.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+METHODS = ('minmax', 'zscore', 'rank')
+
+
+class ColumnScales:
+    """Min-max, z-score and rank scaling of every column of a ``(rows, columns)`` block.
+
+    ``data`` is a ``YearMatrix`` (years down, countries across) or a
+    DataFrame of numeric columns with the observations down, such as
+    ``df_can_t``. Missing values are ignored by the statistics and stay
+    missing when scaled. A constant column scales to 0 (min-max, z-score).
+    """
+
+    def __init__(self, data):
+        if hasattr(data, 'time_major'):
+            self.matrix, self.index, self.columns = data, data.year_numbers, list(data.countries)
+            data.subscribe(self._append)
+        else:
+            self.matrix, self.index, self.columns = None, data.index, list(data.columns)
+            self._values = data.to_numpy(dtype=float)
+        self.position = {name: i for i, name in enumerate(self.columns)}
+        self._scaled = {}
+
+        block = self.block()
+        self.count = (~np.isnan(block)).sum(axis=0)
+        with np.errstate(invalid='ignore'):
+            self.min, self.max = np.nanmin(block, axis=0), np.nanmax(block, axis=0)
+            self.mean = np.nanmean(block, axis=0)
+            # sum of squared deviations, kept so that appended rows can be folded in (Welford)
+            self._m2 = np.nansum((block - self.mean) ** 2, axis=0)
+
+    def _append(self, year, counts):
+        counts = np.asarray(counts, dtype=float)
+        self.index = self.matrix.year_numbers
+        self.count = self.count + 1
+        self.min, self.max = np.minimum(self.min, counts), np.maximum(self.max, counts)
+        delta = counts - self.mean
+        self.mean = self.mean + delta / self.count
+        self._m2 = self._m2 + delta * (counts - self.mean)
+        self._scaled.clear()
+
+    @property
+    def std(self):
+        """Sample standard deviation of every column (``ddof=1``, as pandas)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(self._m2 / (self.count - 1))
+
+    def block(self):
+        """The current ``(rows, columns)`` block as floats."""
+        if self.matrix is None:
+            return self._values
+        return self.matrix.time_major().astype(float)
+
+    def scaled(self, method='minmax'):
+        """The whole block scaled column by column with ``method`` (cached until the data changes).
+
+        'minmax' maps each column onto [0, 1], 'zscore' subtracts the mean and
+        divides by the standard deviation, 'rank' gives the percentile rank in
+        (0, 1] with ties averaged, like ``rank(pct=True)``.
+        """
+        if method not in METHODS:
+            raise ValueError('method must be one of {}, not {!r}'.format(', '.join(METHODS), method))
+        if method not in self._scaled:
+            block = self.block()
+            if method == 'rank':
+                scaled = pd.DataFrame(block).rank(pct=True).to_numpy()
+            else:
+                shift, spread = (self.min, self.max - self.min) if method == 'minmax' else (self.mean, self.std)
+                spread = np.where(spread > 0, spread, np.inf)
+                scaled = (block - shift) / spread
+            self._scaled[method] = scaled
+        return self._scaled[method]
+
+    def normalize(self, names=None, method='minmax'):
+        """The scaled columns ``names`` (all by default) as a DataFrame; raises ``KeyError`` for unknown ones."""
+        names = self.columns if names is None else list(names)
+        columns = [self.position[name] for name in names]
+        return pd.DataFrame(self.scaled(method)[:, columns], index=self.index, columns=names)
+
+    def sizes(self, names, scale=2000, offset=10, method='minmax'):
+        """Bubble sizes ``scaled * scale + offset`` for the columns ``names``, as a DataFrame.
+
+        Only 'minmax' and 'rank' give non-negative sizes.
+        """
+        if method == 'zscore':
+            raise ValueError('z-scores can be negative and cannot size bubbles')
+        return self.normalize(names, method) * scale + offset
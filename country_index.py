@@ -0,0 +1,152 @@
+"""Country name lookup shared by the tables and the choropleth GeoJSON join.
+
+The UN workbook and the world GeoJSON spell many countries differently
+('Viet Nam' / 'Vietnam', 'Russian Federation' / 'Russia', ...). With the exact
+string join used by ``folium.Choropleth(key_on='feature.properties.name')``
+those countries silently stay blank. ``CountryIndex`` hashes normalized names
+and known aliases to row positions once, and ``GeoJoin`` matches a GeoJSON file
+against it up front, reporting whatever is left unmatched a single time.
+"""
+
+import difflib
+import json
+import re
+import unicodedata
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+# UN names used in the Canada workbook -> names used by the world_countries.json GeoJSON
+GEOJSON_ALIASES = {
+    'Bahamas': 'The Bahamas',
+    'Bolivia (Plurinational State of)': 'Bolivia',
+    'Brunei Darussalam': 'Brunei',
+    'Congo': 'Republic of the Congo',
+    "Côte d'Ivoire": 'Ivory Coast',
+    "Democratic People's Republic of Korea": 'North Korea',
+    'Guinea-Bissau': 'Guinea Bissau',
+    'Iran (Islamic Republic of)': 'Iran',
+    "Lao People's Democratic Republic": 'Laos',
+    'Republic of Korea': 'South Korea',
+    'Republic of Moldova': 'Moldova',
+    'Russian Federation': 'Russia',
+    'Serbia': 'Republic of Serbia',
+    'State of Palestine': 'West Bank',
+    'Syrian Arab Republic': 'Syria',
+    'The former Yugoslav Republic of Macedonia': 'Macedonia',
+    'Timor-Leste': 'East Timor',
+    'United Kingdom of Great Britain and Northern Ireland': 'United Kingdom',
+    'Venezuela (Bolivarian Republic of)': 'Venezuela',
+    'Viet Nam': 'Vietnam',
+}
+
+
+def normalize(name):
+    """Fold a country name to its lookup key: no accents, case, punctuation or leading 'the'."""
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode()
+    name = name.casefold().replace('&', ' and ')
+    name = re.sub(r'[^a-z0-9]+', ' ', name).strip()
+    return re.sub(r'^the ', '', name)
+
+
+class CountryIndex:
+    """Hashed lookup from country names (and their aliases) to row positions.
+
+    ``countries`` is the row order, e.g. ``matrix.countries`` or
+    ``df_can.index``. ``aliases`` maps a listed name to alternative spellings
+    (one string or a list); by default the GeoJSON spellings above.
+    """
+
+    def __init__(self, countries, aliases=GEOJSON_ALIASES):
+        self.countries = list(countries)
+        self._keys = {}
+        for row, name in enumerate(self.countries):
+            self._add(normalize(name), row)
+        for name, spellings in (aliases or {}).items():
+            row = self._keys.get(normalize(name))
+            if row is None:
+                continue
+            for spelling in [spellings] if isinstance(spellings, str) else spellings:
+                self._add(normalize(spelling), row)
+
+    def _add(self, key, row):
+        if self._keys.get(key, row) != row:
+            raise ValueError('{!r} and {!r} both normalize to {!r}'
+                             .format(self.countries[self._keys[key]], self.countries[row], key))
+        self._keys[key] = row
+
+    def __contains__(self, name):
+        return normalize(name) in self._keys
+
+    def get(self, name, default=None):
+        """Row of ``name``, or ``default`` when it is not known."""
+        return self._keys.get(normalize(name), default)
+
+    def resolve(self, name):
+        """Row of ``name``; raises ``KeyError`` naming the closest known countries."""
+        row = self.get(name)
+        if row is None:
+            close = difflib.get_close_matches(normalize(name), list(self._keys), n=3)
+            hint = ' (did you mean {}?)'.format(', '.join(repr(key) for key in close)) if close else ''
+            raise KeyError('unknown country {!r}{}'.format(name, hint))
+        return row
+
+    def name(self, name):
+        """The canonical (row) spelling of ``name``."""
+        return self.countries[self.resolve(name)]
+
+    def rows(self, names):
+        """Rows of several countries at once; raises ``KeyError`` for the first unknown one."""
+        return np.array([self.resolve(name) for name in names], dtype=np.intp)
+
+    def match(self, names):
+        """Rows of ``names`` with -1 where a name is unknown, plus the list of unknown names."""
+        rows = np.array([self.get(name, -1) for name in names], dtype=np.intp)
+        return rows, [name for name, row in zip(names, rows) if row < 0]
+
+
+def _feature_key(feature, key_on):
+    value = feature
+    for part in key_on.split('.')[1:]:
+        value = value[part]
+    return value
+
+
+class GeoJoin:
+    """The features of a GeoJSON file matched to the rows of a ``CountryIndex``.
+
+    Matching happens once, when the join is built; countries without a
+    feature and features without a country are reported in one warning
+    each. ``frame(values)`` then keys any per-country column by the GeoJSON's
+    own names, so ``folium.Choropleth`` joins it exactly.
+    """
+
+    def __init__(self, index, geo_data, key_on='feature.properties.name'):
+        if isinstance(geo_data, str):
+            with open(geo_data, encoding='utf-8') as f:
+                geo_data = json.load(f)
+        self.index = index
+        self.key_on = key_on
+        self.names = [_feature_key(feature, key_on) for feature in geo_data['features']]
+        self.rows, missing = index.match(self.names)
+
+        if missing:
+            warnings.warn('{} GeoJSON feature(s) have no matching country: {}'
+                          .format(len(missing), ', '.join(map(str, missing))))
+        unmapped = sorted(set(index.countries) - {index.countries[row] for row in self.rows if row >= 0})
+        if unmapped:
+            warnings.warn('{} countries have no GeoJSON feature and will not be drawn: {}'
+                          .format(len(unmapped), ', '.join(map(str, unmapped))))
+
+    def frame(self, values, column='Total', name='name'):
+        """Two-column DataFrame ``[name, column]`` with one row per matched feature.
+
+        ``values`` is aligned with the index's country order (e.g.
+        ``df_can['Total']`` or ``matrix.totals``).
+        """
+        values = np.asarray(values)
+        matched = self.rows >= 0
+        return pd.DataFrame({name: np.asarray(self.names, dtype=object)[matched],
+                             column: values[self.rows[matched]]})
@@ -0,0 +1,194 @@
+"""Spikes, dips and level shifts of every country, found in one pass over the year matrix.
+
+The Haiti chart of script 1 writes its '2010 Earthquake' label at a
+hand-picked ``(2000, 6000)``, and the Iceland chart of script 2 places the
+financial-crisis arrow by trial and error. ``detect_events`` finds such
+events in all series at once:
+
+* spikes and dips: each point's z-score against the ``window`` years before
+  it, from running sums over the whole ``(countries, years)`` block;
+* level shifts: the single split of each series into two flat stretches that
+  explains most of its variance, scored with the two-sample t statistic of
+  the levels before and after (every split of every series from one
+  cumulative sum).
+
+The result is a table of events with the year, the bar position and the
+value to anchor an annotation on, which ``annotate_events`` draws. A chart
+names the window its event falls in (Iceland's crisis anywhere in 2008-2011),
+not its exact year, and gets the strongest event there, or no label when the
+data shows none.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+KINDS = ('spike', 'dip', 'break')
+
+# where annotation text ends by default, in points from the event: beside peaks and troughs, above shifts
+OFFSETS = {'spike': (-30, -15), 'dip': (-30, 15), 'break': (-30, 40)}
+
+
+def _block(data):
+    # (series, points) floats, the series names and the x values of the points
+    if hasattr(data, 'time_major'):
+        return np.asarray(data.values, dtype=float), list(data.countries), data.year_numbers
+    if isinstance(data, pd.Series):
+        return data.to_numpy(dtype=float)[None], [data.name], data.index.to_numpy()
+    return data.to_numpy(dtype=float).T, list(data.columns), data.index.to_numpy()
+
+
+def rolling_zscores(block, window=8, min_std=1.0):
+    """z-score of every point against the mean and standard deviation of the ``window`` points before it.
+
+    ``block`` is one series or a ``(series, points)`` block; the first
+    ``window`` points of each series have no score (NaN). The standard
+    deviation is never taken below ``min_std``, so a flat stretch does not
+    turn every small change into an event.
+    """
+    block = np.asarray(block, dtype=float)
+    single = block.ndim == 1
+    block = np.atleast_2d(block)
+    if window < 2:
+        raise ValueError('window must cover at least 2 points, not {}'.format(window))
+    # centred first: the running sums of squares then keep their precision
+    centred = block - block.mean(axis=1, keepdims=True)
+    zeros = np.zeros((len(block), 1))
+    sums = np.concatenate([zeros, np.cumsum(centred, axis=1)], axis=1)
+    squares = np.concatenate([zeros, np.cumsum(centred ** 2, axis=1)], axis=1)
+
+    total = sums[:, window:-1] - sums[:, :-window - 1]
+    mean = total / window
+    var = np.maximum((squares[:, window:-1] - squares[:, :-window - 1] - total * mean) / (window - 1), 0)
+    scores = np.full(block.shape, np.nan)
+    scores[:, window:] = (centred[:, window:] - mean) / np.maximum(np.sqrt(var), min_std)
+    return scores[0] if single else scores
+
+
+def change_points(block, min_size=3):
+    """The best single level shift of every series: ``(position, score, before, after)`` arrays.
+
+    ``position`` is the first point after the shift, ``before`` and
+    ``after`` the mean levels on either side, and ``score`` the two-sample t
+    statistic of the shift, with at least ``min_size`` points on each side.
+    """
+    block = np.atleast_2d(np.asarray(block, dtype=float))
+    n = block.shape[1]
+    if n < 2 * min_size:
+        raise ValueError('{} points cannot be split into two stretches of {}'.format(n, min_size))
+    centred = block - block.mean(axis=1, keepdims=True)
+    sums = np.cumsum(centred, axis=1)
+    splits = np.arange(min_size, n - min_size + 1)
+
+    # the variance a split at k explains: k (n - k) / n * (left mean - right mean)**2
+    left = sums[:, splits - 1] / splits
+    right = (sums[:, -1:] - sums[:, splits - 1]) / (n - splits)
+    gain = splits * (n - splits) / n * (left - right) ** 2
+    best = gain.argmax(axis=1)
+    rows = np.arange(len(block))
+
+    within = np.maximum((centred ** 2).sum(axis=1) - gain[rows, best], 0) / (n - 2)
+    k = splits[best]
+    shift = right[rows, best] - left[rows, best]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = np.abs(shift) / np.sqrt(within * (1 / k + 1 / (n - k)))
+    level = block.mean(axis=1)
+    return k, score, level + left[rows, best], level + right[rows, best]
+
+
+def detect_events(data, window=8, threshold=4.0, min_size=3, break_threshold=5.0, kinds=KINDS, min_std=1.0):
+    """Spikes, dips and level shifts of every series of ``data``, strongest first, as a DataFrame.
+
+    ``data`` is a ``YearMatrix``, a DataFrame with years down and series
+    across (``YearMatrix.frame``) or one Series. A point is a 'spike' or a
+    'dip' when its rolling z-score (see ``rolling_zscores``) reaches
+    ``threshold``; a series has a 'break' when its best level shift (see
+    ``change_points``) scores at least ``break_threshold``. Each row gives
+    the 'country', the 'year' and 'position' (index along the series, the x
+    of a bar chart) of the event, the 'value' there, the event 'kind', its
+    'score', and the level 'before' (and 'after', for breaks).
+    """
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        raise ValueError('unknown event kinds: {}'.format(', '.join(sorted(unknown))))
+    block, names, x = _block(data)
+    parts = []
+
+    if 'spike' in kinds or 'dip' in kinds:
+        scores = np.nan_to_num(rolling_zscores(block, window, min_std))
+        flagged = np.zeros(block.shape, dtype=bool)
+        if 'spike' in kinds:
+            flagged |= scores >= threshold
+        if 'dip' in kinds:
+            flagged |= scores <= -threshold
+        rows, columns = np.nonzero(flagged)
+        score = scores[rows, columns]
+        # the level each point was scored against: the mean of the window before it
+        sums = np.concatenate([np.zeros((len(block), 1)), np.cumsum(block, axis=1)], axis=1)
+        parts.append(pd.DataFrame({'row': rows, 'position': columns, 'kind': np.where(score > 0, 'spike', 'dip'),
+                                   'score': np.abs(score), 'after': np.nan,
+                                   'before': (sums[rows, columns] - sums[rows, columns - window]) / window}))
+
+    if 'break' in kinds:
+        positions, scores, before, after = change_points(block, min_size)
+        rows = np.flatnonzero(scores >= break_threshold)
+        parts.append(pd.DataFrame({'row': rows, 'position': positions[rows], 'kind': 'break', 'score': scores[rows],
+                                   'before': before[rows], 'after': after[rows]}))
+
+    if not parts:
+        raise ValueError('no event kinds to detect')
+    events = pd.concat(parts, ignore_index=True)
+    rows, positions = events['row'].to_numpy(dtype=np.intp), events['position'].to_numpy(dtype=np.intp)
+    events = pd.DataFrame({'country': np.array(names, dtype=object)[rows], 'year': x[positions], 'position': positions,
+                           'value': block[rows, positions], 'kind': events['kind'].to_numpy(dtype=object),
+                           'score': events['score'].to_numpy(), 'before': events['before'].to_numpy(),
+                           'after': events['after'].to_numpy()})
+    return events.sort_values('score', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def _window(key):
+    # a label key is one year or an inclusive (first, last) range of years
+    first, last = key if isinstance(key, tuple) else (key, key)
+    if first > last:
+        raise ValueError('label window {} ends before it starts'.format(key))
+    return first, last
+
+
+def annotate_events(ax, events, x='year', fmt='{year} {kind}', labels=None, offset=None, arrowprops=None,
+                    **text_kwargs):
+    """Annotate ``events`` on ``ax`` with an arrow to each event's point; returns the annotations.
+
+    ``x`` names the column giving the x position: 'year' for line charts,
+    'position' for bar charts. Without ``labels`` every row is annotated with
+    ``fmt`` filled from the row. ``labels`` maps a year or an inclusive
+    ``(first, last)`` window of years to a text: only the strongest event in
+    each window is annotated, with that text. A window without any event is
+    left unlabelled (detection depends on the data, so a quiet stretch must
+    not stop a chart), with one warning naming all such labels. ``offset``
+    places the text in points from the event (by default per kind, see
+    ``OFFSETS``, with the text ending there).
+    """
+    arrowprops = dict(arrowstyle='->', connectionstyle='arc3', color='blue', lw=2) if arrowprops is None else arrowprops
+    text_kwargs.setdefault('ha', 'right')
+    if labels is None:
+        picked = [(fmt.format(**event), event) for event in events.to_dict('records')]
+    else:
+        picked, missing = [], []
+        years = events['year'].to_numpy()
+        for key, text in labels.items():
+            first, last = _window(key)
+            inside = events[(years >= first) & (years <= last)]
+            if inside.empty:
+                missing.append('{!r} ({}-{})'.format(text, first, last))
+            else:
+                picked.append((text, inside.loc[inside['score'].idxmax()].to_dict()))
+        if missing:
+            warnings.warn('no event to label, left out: {}'.format(', '.join(missing)), stacklevel=2)
+
+    annotations = []
+    for text, event in picked:
+        annotations.append(ax.annotate(text, xy=(event[x], event['value']), xytext=offset or OFFSETS[event['kind']],
+                                       textcoords='offset points', arrowprops=arrowprops, **text_kwargs))
+    return annotations
@@ -0,0 +1,183 @@
+"""Content-addressed cache of rendered chart images.
+
+Most report charts do not change between runs, yet re-rendering them costs the
+full matplotlib time. ``FigureCache`` stores the encoded image bytes under a
+SHA-256 of everything that determines the picture: the source of the chart's
+drawing module and of every project module it draws with (``StackedArea``,
+``label_bars``, ...), the exact data slice it shows, its plot parameters (figsize, colors, alpha,
+bins, stacked, ...), the output format and dpi, and the matplotlib version. A
+hit returns the stored bytes without drawing anything. The directory is kept
+under ``max_bytes`` by evicting the least recently used images.
+"""
+
+import functools
+import hashlib
+import io
+import os
+import sys
+import types
+
+import matplotlib
+import numpy as np
+import pandas as pd
+
+from canada_data import CACHE_DIR
+
+
+# bump to invalidate every cached image, e.g. after a change outside the project's modules that shows in the images
+CACHE_VERSION = 2
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _update(h, obj):
+    # feed a data slice into the hash; values are hashed by their bytes, labels by repr
+    if isinstance(obj, pd.DataFrame):
+        h.update(b'frame')
+        _update(h, obj.index)
+        for column in obj.columns:
+            h.update(repr(column).encode())
+            _update(h, obj[column].to_numpy())
+    elif isinstance(obj, pd.Series):
+        h.update(b'series' + repr(obj.name).encode())
+        _update(h, obj.index)
+        _update(h, obj.to_numpy())
+    elif isinstance(obj, pd.Index):
+        h.update(b'index')
+        _update(h, obj.to_numpy())
+    elif isinstance(obj, np.ndarray) and obj.dtype != object:
+        h.update('{}{}'.format(obj.dtype.str, obj.shape).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(repr(obj.tolist()).encode())
+    elif isinstance(obj, tuple):
+        h.update(b'tuple')
+        for item in obj:
+            _update(h, item)
+    else:
+        h.update(repr(obj).encode())
+
+
+def _project_modules(module):
+    # the module and every module from its directory that it uses, through its globals, transitively
+    directory = os.path.dirname(os.path.abspath(module.__file__))
+    found, stack = {}, [module]
+    while stack:
+        module = stack.pop()
+        if module.__name__ in found:
+            continue
+        found[module.__name__] = module
+        for value in vars(module).values():
+            if not isinstance(value, types.ModuleType):
+                value = sys.modules.get(getattr(value, '__module__', None) or '')
+            path = getattr(value, '__file__', None)
+            if path and os.path.dirname(os.path.abspath(path)) == directory:
+                stack.append(value)
+    return [found[name] for name in sorted(found)]
+
+
+def _code(h, code):
+    # bytecode and constants of a function and of the comprehensions and functions nested in it;
+    # nested code objects are recursed into, since their repr carries a per-process address
+    h.update(code.co_code)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _code(h, const)
+        else:
+            h.update(repr(const).encode())
+
+
+@functools.lru_cache(maxsize=None)
+def _drawing_code(draw):
+    # digest of the code behind ``draw``: the source files of its project modules, else its bytecode
+    h = hashlib.sha256()
+    module = sys.modules.get(draw.__module__)
+    if getattr(module, '__file__', None):
+        for dependency in _project_modules(module):
+            h.update(dependency.__name__.encode())
+            with open(dependency.__file__, 'rb') as f:
+                h.update(f.read())
+    else:
+        _code(h, draw.__code__)
+    return h.hexdigest()
+
+
+def figure_key(draw, data, params, fmt, dpi=None):
+    """The cache key of drawing ``data`` with ``draw(data, **params)`` as a ``fmt`` image."""
+    h = hashlib.sha256()
+    h.update('{}:{}:{}:{}:{}'.format(CACHE_VERSION, matplotlib.__version__, draw.__module__,
+                                     draw.__qualname__, fmt).encode())
+    h.update(_drawing_code(draw).encode())
+    h.update(repr(sorted(params.items())).encode())
+    h.update(repr(dpi).encode())
+    _update(h, data)
+    return h.hexdigest()
+
+
+class FigureCache:
+    """Image bytes on disk, keyed by ``figure_key``, bounded by size with LRU eviction.
+
+    Several processes may share one directory: files are written atomically and
+    a file evicted by another process simply counts as a miss.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or os.path.join(CACHE_DIR, 'figures')
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key, fmt):
+        return os.path.join(self.directory, '{}.{}'.format(key, fmt))
+
+    def get(self, key, fmt):
+        """The cached bytes for ``key``, or None; a hit marks the entry as recently used."""
+        path = self._path(key, fmt)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def put(self, key, fmt, data):
+        """Store ``data`` under ``key`` and evict old entries if the cache is over its size."""
+        path = self._path(key, fmt)
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used images until the directory fits in ``max_bytes``."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.tmp'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def render(self, draw, data, params, fmt='png', dpi=None):
+        """Return the image bytes of ``draw(data, **params)``, drawing only on a cache miss."""
+        key = figure_key(draw, data, params, fmt, dpi)
+        image = self.get(key, fmt)
+        if image is None:
+            buffer = io.BytesIO()
+            draw(data, **params).savefig(buffer, format=fmt, dpi=dpi)
+            image = buffer.getvalue()
+            self.put(key, fmt, image)
+        return image
@@ -0,0 +1,247 @@
+"""Histograms that are binned once and drawn from their counts.
+
+The scripts call ``np.histogram`` to get the bin edges for the xticks and then
+``.plot(kind='hist')``, which bins the same data again. A ``Histogram`` keeps
+the counts and edges of a single binning, answers both questions from them
+and draws its bars straight from the counts.
+
+Counts with the same edges add up, so a histogram can also be built chunk by
+chunk (``add``, ``merge``, ``histogram_chunks``) without ever holding the
+full column in memory, e.g. over ``incidents_data.iter_incident_chunks``.
+Streaming needs the edges up front: pass ``bins`` together with ``range``,
+or the edges themselves.
+
+``MultiHistogram`` does the same for many series at once (the Nordic or
+Greece/Albania/Bulgaria charts, or dozens of countries): one set of edges
+over all of them and one ``searchsorted`` plus ``bincount`` over the whole 2D
+block give a ``(series, bins)`` count matrix, drawn stacked or overlaid.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# values per vectorized binning step of MultiHistogram.add
+_BLOCK = 65536
+
+
+def _finite(values):
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        values = values[np.isfinite(values)]
+    return values.ravel()
+
+
+class Histogram:
+    """Bin ``counts`` over ``edges`` (``len(edges) == len(counts) + 1``), as from ``np.histogram``.
+
+    ``outside`` counts the values that fell outside the edges while chunks
+    were added; ``np.histogram`` drops those silently.
+    """
+
+    def __init__(self, counts, edges, outside=0):
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.edges = np.asarray(edges, dtype=float)
+        if self.edges.ndim != 1 or len(self.edges) != len(self.counts) + 1:
+            raise ValueError('{} edges do not bound {} bins'.format(len(self.edges), len(self.counts)))
+        self.outside = outside
+        # evenly spaced edges are counted with np.histogram's fast path (no searchsorted)
+        self._uniform = np.array_equal(self.edges, np.linspace(self.edges[0], self.edges[-1], len(self.edges)))
+
+    @classmethod
+    def from_values(cls, values, bins=10, range=None):
+        """Bin ``values`` once; ``bins`` and ``range`` mean what they do for ``np.histogram``.
+
+        NaNs (missing values) are left out instead of making the range fail.
+        """
+        counts, edges = np.histogram(_finite(values), bins, range)
+        return cls(counts, edges)
+
+    @classmethod
+    def empty(cls, bins=10, range=None):
+        """A histogram with no values yet, to ``add`` chunks to.
+
+        ``bins`` is either the edges or a bin count, in which case ``range``
+        (low, high) is required.
+        """
+        if np.ndim(bins) == 0:
+            if range is None:
+                raise ValueError('an empty histogram needs its edges, or a bin count and a range')
+            bins = np.linspace(range[0], range[1], int(bins) + 1)
+        bins = np.asarray(bins, dtype=float)
+        return cls(np.zeros(len(bins) - 1, dtype=np.int64), bins)
+
+    def _bin(self, values):
+        if self._uniform:
+            counts, _ = np.histogram(values, len(self.counts), (self.edges[0], self.edges[-1]))
+        else:
+            counts, _ = np.histogram(values, self.edges)
+        return counts
+
+    def add(self, values):
+        """Fold a chunk of values into the counts (same edges); returns ``self``."""
+        values = _finite(values)
+        counts = self._bin(values)
+        self.counts += counts
+        self.outside += len(values) - int(counts.sum())
+        return self
+
+    def merge(self, other):
+        """A new histogram with the counts of both; the edges must be the same."""
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError('cannot merge histograms with different bin edges')
+        return Histogram(self.counts + other.counts, self.edges, self.outside + other.outside)
+
+    __add__ = merge
+
+    @property
+    def bins(self):
+        return len(self.counts)
+
+    @property
+    def total(self):
+        """Number of values inside the edges."""
+        return int(self.counts.sum())
+
+    @property
+    def widths(self):
+        return np.diff(self.edges)
+
+    @property
+    def centers(self):
+        return (self.edges[:-1] + self.edges[1:]) / 2
+
+    def draw(self, ax, bottom=None, xticks=True, margin=None, **bar_kwargs):
+        """Draw the counts as bars on ``ax`` (one bar per bin, like ``plot(kind='hist')``).
+
+        ``bottom`` stacks the bars on other counts; ``xticks`` puts the ticks
+        on the bin edges and ``margin`` pads the x axis on both sides. Other
+        keywords (color, alpha, label, ...) go to ``ax.bar``. Returns the
+        bar container.
+        """
+        bars = ax.bar(self.edges[:-1], self.counts, width=self.widths, bottom=bottom, align='edge', **bar_kwargs)
+        if xticks:
+            ax.set_xticks(self.edges)
+        if margin is not None:
+            ax.set_xlim(self.edges[0] - margin, self.edges[-1] + margin)
+        return bars
+
+
+def histogram_chunks(chunks, bins=10, range=None):
+    """One ``Histogram`` over an iterable of value chunks, binned as they arrive.
+
+    The edges are fixed before the first chunk (see ``Histogram.empty``), so
+    only one chunk is in memory at a time.
+    """
+    histogram = Histogram.empty(bins, range)
+    for chunk in chunks:
+        histogram.add(chunk)
+    return histogram
+
+
+class MultiHistogram:
+    """Counts of several series over shared ``edges``: ``counts[i]`` is series ``labels[i]``."""
+
+    def __init__(self, counts, edges, labels=None, outside=None):
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.edges = np.asarray(edges, dtype=float)
+        if self.counts.ndim != 2 or len(self.edges) != self.counts.shape[1] + 1:
+            raise ValueError('{} edges do not bound {} bins'.format(len(self.edges), self.counts.shape[-1]))
+        self.labels = list(range(len(self.counts))) if labels is None else list(labels)
+        self.outside = np.zeros(len(self.counts), dtype=np.int64) if outside is None else np.asarray(outside)
+        self._uniform = np.array_equal(self.edges, np.linspace(self.edges[0], self.edges[-1], len(self.edges)))
+
+    @staticmethod
+    def _block(data):
+        # (series, values): DataFrame columns (years down, countries across) are the series
+        if isinstance(data, pd.DataFrame):
+            return data.to_numpy().T, list(data.columns)
+        return np.atleast_2d(np.asarray(data)), None
+
+    @classmethod
+    def from_block(cls, data, bins=10, range=None, labels=None):
+        """Bin every series of ``data`` in one pass.
+
+        ``data`` is a DataFrame (one series per column) or a 2D array (one
+        series per row). With a bin count the edges span all series together,
+        as ``plot(kind='hist')`` and ``np.histogram(df, bins)`` do.
+        """
+        block, columns = cls._block(data)
+        if np.ndim(bins) == 0:
+            bins = np.histogram_bin_edges(_finite(block), bins, range)
+        histogram = cls(np.zeros((len(block), len(bins) - 1), dtype=np.int64), bins,
+                        columns if labels is None else labels)
+        return histogram.add(block)
+
+    def add(self, data):
+        """Fold a chunk (same series, any number of values each) into the counts; returns ``self``."""
+        block, _ = self._block(data)
+        n, bins = self.counts.shape
+        if len(block) != n:
+            raise ValueError('expected {} series, got {}'.format(n, len(block)))
+
+        if block.shape[1] >= _BLOCK:
+            # long series gain nothing from sharing a pass; np.histogram's own blocked loop is faster
+            for row, values in enumerate(block):
+                histogram = Histogram(self.counts[row], self.edges).add(values)
+                self.counts[row] = histogram.counts
+                self.outside[row] += histogram.outside
+            return self
+
+        # cache-sized slices of rows, like np.histogram's own blocks of 65536 values
+        step = max(1, _BLOCK // max(1, block.shape[1]))
+        for start in range(0, n, step):
+            rows = slice(start, start + step)
+            counts, outside = self._bin(block[rows])
+            self.counts[rows] += counts
+            self.outside[rows] += outside
+        return self
+
+    def _bin(self, block):
+        n, bins = block.shape[0], self.counts.shape[1]
+        low, high = self.edges[0], self.edges[-1]
+        valid = ~np.isnan(block) if block.dtype.kind == 'f' else np.ones(block.shape, dtype=bool)
+        inside = valid & (block >= low) & (block <= high)
+        values = block[inside]
+        rows = np.nonzero(inside)[0]
+
+        # bins are closed on the left, except the last one which also holds the right edge
+        if self._uniform:
+            # arithmetic bin index, corrected where float rounding lands next to an edge (as np.histogram does)
+            index = ((values - low) * (bins / (high - low))).astype(np.intp)
+            np.minimum(index, bins - 1, out=index)
+            index -= values < self.edges[index]
+            index += (values >= self.edges[index + 1]) & (index != bins - 1)
+        else:
+            index = np.minimum(np.searchsorted(self.edges, values, side='right') - 1, bins - 1)
+
+        counts = np.bincount(rows * bins + index, minlength=n * bins).reshape(n, bins)
+        return counts, valid.sum(axis=1) - inside.sum(axis=1)
+
+    def __getitem__(self, label):
+        """The ``Histogram`` of one series."""
+        row = self.labels.index(label)
+        return Histogram(self.counts[row], self.edges, int(self.outside[row]))
+
+    def total(self):
+        """The ``Histogram`` of all series together."""
+        return Histogram(self.counts.sum(axis=0), self.edges, int(self.outside.sum()))
+
+    def draw(self, ax, stacked=False, colors=None, xticks=True, margin=None, legend=True, **bar_kwargs):
+        """Draw every series as bars, stacked on each other or overlaid; returns the bar containers.
+
+        ``colors`` is one color per series; the other keywords are those of
+        ``Histogram.draw``.
+        """
+        bottoms = np.cumsum(self.counts, axis=0) - self.counts if stacked else [None] * len(self.counts)
+        colors = [None] * len(self.counts) if colors is None else list(colors)
+        containers = [Histogram(counts, self.edges).draw(ax, bottom=bottom, xticks=False, color=color,
+                                                         label=str(label), **bar_kwargs)
+                      for counts, bottom, color, label in zip(self.counts, bottoms, colors, self.labels)]
+        if xticks:
+            ax.set_xticks(self.edges)
+        if margin is not None:
+            ax.set_xlim(self.edges[0] - margin, self.edges[-1] + margin)
+        if legend:
+            ax.legend()
+        return containers
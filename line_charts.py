@@ -0,0 +1,214 @@
+"""Per-country line charts drawn by reusing one figure.
+
+``DataFrame.plot(kind='line')`` builds a new figure, axes, lines, ticks and
+legend for every chart, and ``savefig`` then renders all of it. When the same
+kind of trend chart is produced for every country only the data and the title
+change, so ``LineChartTemplate`` builds the artists once and, per chart, swaps
+the ``Line2D`` data, the title and the legend texts.
+
+The y axis is limited to a small set of round values (0 up to 1, 1.2, 1.5,
+2, 2.5, 3, 4, 5, 6 or 8 times a power of ten), so many countries share the
+same axes background. Each background (frame, grid, ticks, labels) is rendered
+once and cached; a chart is then the cached background plus its lines blitted
+on top, and PNGs are encoded straight from the canvas buffer with fast zlib
+settings.
+
+``draw_small_multiples`` covers the other side: comparing many countries at
+once. Instead of one axes per country it lays every sparkline out on a grid
+inside a single axes and draws them all as one rasterized ``LineCollection``.
+"""
+
+import os
+import struct
+import zlib
+from collections import OrderedDict
+
+import matplotlib as mpl
+import matplotlib.style
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+
+# upper y limits are rounded up to one of these steps times a power of ten
+NICE_STEPS = (1, 1.2, 1.5, 2, 2.5, 3, 4, 5, 6, 8, 10)
+
+
+def _nice(value):
+    # smallest NICE_STEPS multiple of a power of ten that is >= value (> 0)
+    scale = 10.0 ** np.floor(np.log10(value))
+    return float(scale * next(step for step in NICE_STEPS if step * scale >= value))
+
+
+def _png(rgba, level=1):
+    # RGB PNG without row filters; much faster to write than savefig/PIL, a little larger
+    height, width = rgba.shape[:2]
+    raw = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 0] = 0
+    raw[:, 1:] = rgba[..., :3].reshape(height, -1)
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+    return b''.join([b'\x89PNG\r\n\x1a\n',
+                     chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+                     chunk(b'IDAT', zlib.compress(raw.tobytes(), level)),
+                     chunk(b'IEND', b'')])
+
+
+class LineChartTemplate:
+    """A reusable figure with ``n_lines`` lines over a fixed x axis (the years).
+
+    ``draw(block, title, labels)`` loads a ``(n_lines, len(x))`` block into the
+    existing lines; ``save(path)`` writes the current chart. PNG output is
+    blitted onto a cached background, other formats go through ``savefig``.
+    """
+
+    def __init__(self, x, n_lines=1, figsize=None, xlabel='Years', ylabel='Number of Immigrants',
+                 style='ggplot', dpi=100, backgrounds=16):
+        self.x = np.asarray(x)
+        with mpl.style.context(style):
+            self.fig = Figure(figsize=figsize, dpi=dpi)
+            self.canvas = FigureCanvasAgg(self.fig)
+            self.ax = self.fig.subplots()
+            self.lines = [self.ax.plot(self.x, np.zeros(len(self.x)))[0] for _ in range(n_lines)]
+            self.ax.set_xlabel(xlabel)
+            self.ax.set_ylabel(ylabel)
+            self.ax.set_xlim(self.x[0], self.x[-1])
+            self.title = self.ax.set_title('')
+            self.legend = self.ax.legend(self.lines, [''] * n_lines) if n_lines > 1 else None
+
+        # everything that changes per chart is left out of the cached backgrounds
+        self._dynamic = self.lines + [self.title] + ([self.legend] if self.legend is not None else [])
+        for artist in self._dynamic:
+            artist.set_animated(True)
+        self._backgrounds = OrderedDict()
+        self._max_backgrounds = backgrounds
+
+    def _ylim(self, block):
+        # counts start at 0; only negative data (e.g. net migration) moves the bottom
+        low, high = float(block.min()), float(block.max())
+        low = -_nice(-low) if low < 0 else 0.0
+        high = _nice(high) if high > 0 else (0.0 if low < 0 else 1.0)
+        return low, high
+
+    def _background(self, ylim):
+        background = self._backgrounds.pop(ylim, None)
+        if background is None:
+            self.ax.set_ylim(ylim)
+            self.canvas.draw()
+            background = self.canvas.copy_from_bbox(self.fig.bbox)
+            if len(self._backgrounds) >= self._max_backgrounds:
+                self._backgrounds.popitem(last=False)
+        self._backgrounds[ylim] = background
+        return background
+
+    def draw(self, block, title='', labels=None):
+        """Show ``block`` (one row per line) with ``title`` and legend ``labels``; returns the figure."""
+        block = np.atleast_2d(block)
+        if len(block) != len(self.lines):
+            raise ValueError('template has {} lines, got {} series'.format(len(self.lines), len(block)))
+
+        ylim = self._ylim(block)
+        self.canvas.restore_region(self._background(ylim))
+        self.ax.set_ylim(ylim)
+        for line, series in zip(self.lines, block):
+            line.set_ydata(series)
+        self.title.set_text(title)
+        if self.legend is not None and labels is not None:
+            for text, label in zip(self.legend.get_texts(), labels):
+                text.set_text(label)
+
+        renderer = self.canvas.get_renderer()
+        for artist in self._dynamic:
+            artist.draw(renderer)
+        return self.fig
+
+    def save(self, path, fmt=None):
+        """Write the chart last passed to ``draw``; returns ``path``."""
+        fmt = fmt or os.path.splitext(path)[1][1:] or 'png'
+        if fmt == 'png':
+            with open(path, 'wb') as f:
+                f.write(_png(np.asarray(self.canvas.buffer_rgba())))
+            return path
+
+        # vector output is re-rendered in full, including the usually animated artists
+        for artist in self._dynamic:
+            artist.set_animated(False)
+        try:
+            self.fig.savefig(path, format=fmt)
+        finally:
+            for artist in self._dynamic:
+                artist.set_animated(True)
+        return path
+
+
+def render_country_lines(matrix, countries=None, out_dir='charts', fmt='png', title='Immigration from {}',
+                         figsize=None, dpi=100):
+    """Save one trend chart per country (all of ``matrix`` by default); returns the paths.
+
+    Files are named after the country, with characters that are unsafe in
+    file names replaced by '_'.
+    """
+    countries = matrix.countries if countries is None else list(countries)
+    os.makedirs(out_dir, exist_ok=True)
+
+    template = LineChartTemplate(matrix.year_numbers, figsize=figsize, dpi=dpi)
+    paths = []
+    for country in countries:
+        template.draw(matrix.country(country), title.format(country))
+        name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in country)
+        paths.append(template.save(os.path.join(out_dir, '{}.{}'.format(name, fmt)), fmt))
+    return paths
+
+
+def draw_small_multiples(df, ncols=None, sharey=True, title=None, figsize=None, color=None, linewidth=0.8,
+                         fontsize=6, style='ggplot'):
+    """One sparkline per column of ``df`` (years down, countries across, as ``YearMatrix.frame``).
+
+    The panels share the x axis (the years) and, with ``sharey``, one y
+    scale from 0 to the overall maximum; otherwise each panel is scaled to
+    its own maximum. All lines are a single ``LineCollection`` and all
+    panel backgrounds a second one, so the cost hardly depends on the number
+    of panels. ``ncols`` defaults to a roughly 3:2 landscape grid.
+    """
+    values = np.asarray(df, dtype=float).T
+    names = [str(name) for name in df.columns]
+    n, length = values.shape
+    ncols = ncols or max(1, int(np.ceil(np.sqrt(n * 1.5))))
+    nrows = max(1, -(-n // ncols))
+
+    if sharey:
+        scale = np.full(n, max(values.max(initial=0), 1))
+    else:
+        scale = np.where(values.max(axis=1, initial=0) > 0, values.max(axis=1, initial=0), 1)
+    col, row = np.arange(n) % ncols, nrows - 1 - np.arange(n) // ncols
+
+    # each panel is a unit cell: the line fills x in [0.05, 0.95] and y in [0.08, 0.72], the name sits above
+    x = 0.05 + 0.9 * np.linspace(0, 1, length)
+    segments = np.empty((n, length, 2))
+    segments[..., 0] = col[:, None] + x
+    segments[..., 1] = row[:, None] + 0.08 + 0.64 * values / scale[:, None]
+    baselines = np.stack([np.stack([col + 0.05, row + 0.08], axis=1),
+                          np.stack([col + 0.95, row + 0.08], axis=1)], axis=1)
+
+    with mpl.style.context(style):
+        fig = Figure(figsize=figsize or (ncols * 0.9, nrows * 0.6 + 0.6))
+        ax = fig.add_axes((0, 0, 1, 1 - 0.5 / fig.get_figheight() if title else 1))
+        ax.set_axis_off()
+        ax.set_xlim(0, ncols)
+        ax.set_ylim(0, nrows)
+        ax.add_collection(LineCollection(baselines, colors='0.8', linewidths=0.5, rasterized=True))
+        ax.add_collection(LineCollection(segments, colors=color or mpl.rcParams['axes.prop_cycle'].by_key()['color'][0],
+                                         linewidths=linewidth, rasterized=True))
+        for name, c, r in zip(names, col, row):
+            ax.text(c + 0.05, r + 0.78, name if len(name) <= 18 else name[:17] + '\u2026', fontsize=fontsize,
+                    va='bottom', clip_on=False)
+        if title:
+            fig.suptitle(title)
+        footer = 'x: {}\u2013{}'.format(df.index[0], df.index[-1])
+        if sharey:
+            footer += ', y: 0\u2013{:,.0f} on every panel'.format(scale[0])
+        fig.text(0.995, 0.005, footer, ha='right', va='bottom', fontsize=fontsize)
+    return fig
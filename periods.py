@@ -0,0 +1,108 @@
+"""Sums, means and maxima over periods of years (decades, five-year windows, ...) in one call.
+
+Script 3 builds its decade table by listing the years of each decade by hand
+(``years_80s``, ``years_90s``, ``years_00s``) and summing every list over
+``df_top15`` separately. Here a breakdown is given by its boundaries, e.g.
+``[1980, 1990, 2000, 2010]`` for the three decades: the years are located
+with one ``searchsorted`` and every row is reduced over all periods at once
+with ``np.add.reduceat`` (``np.maximum.reduceat`` for maxima), so any
+breakdown of the full country table is a single vectorized call.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+AGGREGATES = ('sum', 'mean', 'max', 'min')
+
+
+def period_bounds(years, step=10, start=None):
+    """Boundaries of ``step``-year periods covering ``years``, the first starting at ``start``.
+
+    By default the first period starts at the first year rounded down to a
+    multiple of ``step``, so ``step=10`` gives calendar decades; the last
+    period ends after the last year and may be shorter.
+    """
+    years = np.asarray(years, dtype=int)
+    first, last = int(years.min()), int(years.max())
+    start = first - first % step if start is None else start
+    bounds = list(range(start, last + 1, step))
+    return bounds + [min(bounds[-1] + step, last + 1)]
+
+
+def period_labels(bounds):
+    """Column labels for the periods between ``bounds``: '1980s' for calendar decades, else '1980-1984'."""
+    labels = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        if stop - start == 10 and start % 10 == 0:
+            labels.append('{}s'.format(start))
+        elif stop - start == 1:
+            labels.append(str(start))
+        else:
+            labels.append('{}-{}'.format(start, stop - 1))
+    return labels
+
+
+def aggregate_periods(block, years, bounds, how='sum'):
+    """Reduce every row of the ``(rows, years)`` block over the periods between ``bounds``.
+
+    ``years`` labels the columns in ascending order; period i covers
+    ``bounds[i] <= year < bounds[i + 1]`` and years outside all periods are
+    left out. ``how`` is 'sum', 'mean', 'max' or 'min'. Returns a
+    ``(rows, periods)`` array; a period without any year sums to 0 and has
+    no mean, max or min (NaN).
+    """
+    if how not in AGGREGATES:
+        raise ValueError('how must be one of {}, not {!r}'.format(', '.join(AGGREGATES), how))
+    bounds = np.asarray(bounds)
+    if len(bounds) < 2 or np.any(np.diff(bounds) <= 0):
+        raise ValueError('bounds must be at least two increasing years')
+    block = np.asarray(block)
+    block = block.reshape(-1, block.shape[-1])
+
+    # column where every period starts; reduceat then needs the block cut to [first start, last stop)
+    edges = np.searchsorted(np.asarray(years), bounds)
+    counts = np.diff(edges)
+    inside = block[:, edges[0]:edges[-1]]
+    starts = edges[:-1] - edges[0]
+    if starts[-1] == inside.shape[1]:
+        # empty periods at the end start past the last column; give them one of their own
+        inside = np.concatenate([inside, np.zeros((len(block), 1), dtype=block.dtype)], axis=1)
+
+    if how in ('sum', 'mean'):
+        integral = block.dtype.kind in 'iub'
+        result = np.add.reduceat(inside, starts, axis=1, dtype=np.int64 if integral else None)
+        # reduceat gives the element at the start for an empty period; it sums to nothing
+        result[:, counts == 0] = 0
+        if how == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = result / counts
+        return result
+    result = (np.maximum if how == 'max' else np.minimum).reduceat(inside, starts, axis=1)
+    if (counts == 0).any():
+        result = result.astype(float)
+        result[:, counts == 0] = np.nan
+    return result
+
+
+def period_table(data, bounds=None, step=10, how='sum', names=None, start=None):
+    """The periods of ``data`` aggregated with ``how``, as a DataFrame with one row per country.
+
+    ``data`` is a ``YearMatrix`` (``names`` picks countries, all by default)
+    or a DataFrame with countries down and years across, like ``df_can``;
+    columns that are not years (Continent, Total, ...) are ignored. Without
+    ``bounds`` the periods are ``step`` years long (see ``period_bounds``).
+    The columns are named by ``period_labels``.
+    """
+    if hasattr(data, 'time_major'):
+        index = pd.Index(data.countries if names is None else list(names))
+        block, years = data.block(index), data.year_numbers
+    else:
+        columns = [column for column in data.columns if str(column).isdigit()]
+        frame = data[columns] if names is None else data.loc[list(names), columns]
+        index, block, years = frame.index, frame.to_numpy(), np.array([int(column) for column in columns])
+        order = np.argsort(years, kind='stable')
+        block, years = block[:, order], years[order]
+
+    bounds = period_bounds(years, step, start) if bounds is None else list(bounds)
+    return pd.DataFrame(aggregate_periods(block, years, bounds, how), index=index, columns=period_labels(bounds))
@@ -0,0 +1,77 @@
+"""Top-N / bottom-N country rankings without sorting ``df_can``.
+
+The charts used to ``df_can.sort_values(by='Total', inplace=True)`` and take
+``head()`` or ``tail()``, which reorders the shared frame under every later
+cell. ``RankingIndex`` answers the same questions from a ``YearMatrix``
+without touching any row order: a top-k is an O(n) ``argpartition`` plus a
+sort of the k winners, and a full ranking is sorted once per metric and cached.
+"""
+
+import numpy as np
+
+
+def _smallest(values, k):
+    """Positions of the ``k`` smallest ``values`` in ascending order, earlier positions winning ties."""
+    n = len(values)
+    k = min(k, n)
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        candidates = np.argpartition(values, k - 1)[:k]
+        # the partition may cut a run of ties arbitrarily; keep the earliest rows, like a stable sort
+        threshold = values[candidates].max()
+        below = np.flatnonzero(values < threshold)
+        tied = np.flatnonzero(values == threshold)[:k - len(below)]
+        candidates = np.concatenate([below, tied])
+    else:
+        candidates = np.arange(n)
+    return candidates[np.lexsort((candidates, values[candidates]))]
+
+
+class RankingIndex:
+    """Rank the countries of a ``YearMatrix`` by 'Total' or by any single year.
+
+    Ties are broken by row order, as a stable sort would. Full orderings are
+    cached per metric; appending a year to the matrix only drops the cached
+    'Total' ordering, since the existing year columns do not change.
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self._orders = {}
+        matrix.subscribe(self._append)
+
+    def _append(self, year, counts):
+        self._orders.pop('Total', None)
+
+    def _metric(self, metric):
+        if metric == 'Total':
+            return self.matrix.totals
+        return self.matrix.year(metric)
+
+    def order(self, metric='Total'):
+        """Row positions of all countries from largest to smallest ``metric`` (cached)."""
+        metric = str(metric)
+        if metric not in self._orders:
+            values = np.asarray(self._metric(metric), dtype=np.int64)
+            self._orders[metric] = np.argsort(-values, kind='stable')
+        return self._orders[metric]
+
+    def top_rows(self, k, metric='Total'):
+        """Row positions of the ``k`` largest countries by ``metric``, largest first."""
+        metric = str(metric)
+        if metric in self._orders:
+            return self._orders[metric][:k]
+        return _smallest(-np.asarray(self._metric(metric), dtype=np.int64), k)
+
+    def bottom_rows(self, k, metric='Total'):
+        """Row positions of the ``k`` smallest countries by ``metric``, smallest first."""
+        return _smallest(np.asarray(self._metric(str(metric)), dtype=np.int64), k)
+
+    def top(self, k, metric='Total'):
+        """Names of the ``k`` largest countries by ``metric``, largest first."""
+        return [self.matrix.countries[row] for row in self.top_rows(k, metric)]
+
+    def bottom(self, k, metric='Total'):
+        """Names of the ``k`` smallest countries by ``metric``, smallest first."""
+        return [self.matrix.countries[row] for row in self.bottom_rows(k, metric)]
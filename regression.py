@@ -0,0 +1,130 @@
+"""Regression lines with confidence bands, without a bootstrap loop.
+
+``sns.regplot`` draws the 95% band around its line by refitting the model on
+1000 resamples of the data, one ``pinv`` per resample in a Python loop, on
+every render. For an ordinary least-squares line the band has a closed form:
+``confidence_band`` computes it from the standard error of the fitted mean
+and a Student t quantile. When a bootstrap band is wanted it runs all the
+resamples at once instead: one ``(n_boot, points)`` index draw from a seeded
+generator, one stacked ``pinv`` and one matrix product for the fitted values
+of every resample.
+
+``y`` may also be a ``(points, series)`` block sharing ``x`` (countries
+across, as ``YearMatrix.frame`` gives them), so the bands of many country
+groups come out of the same solve. ``draw_regression`` draws the points, the
+line and the band the way ``regplot`` does.
+"""
+
+from statistics import NormalDist
+
+import matplotlib as mpl
+import numpy as np
+
+
+def _t_quantile(q, df):
+    # Student t quantile; scipy when it is installed, else exact forms or the Cornish-Fisher expansion
+    try:
+        from scipy.stats import t
+    except ImportError:
+        pass
+    else:
+        return float(t.ppf(q, df))
+    if df == 1:
+        return float(np.tan(np.pi * (q - 0.5)))
+    if df == 2:
+        return float((2 * q - 1) / np.sqrt(2 * q * (1 - q)))
+    z = NormalDist().inv_cdf(q)
+    return (z + (z ** 3 + z) / 4 / df
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96 / df ** 2
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384 / df ** 3
+            + (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160 / df ** 4)
+
+
+def _design(x, grid, order):
+    # polynomial design matrices on x standardised by the data, so that year**2 stays well conditioned
+    centre, spread = x.mean(), x.std() or 1.0
+    return (np.vander((x - centre) / spread, order + 1, increasing=True),
+            np.vander((grid - centre) / spread, order + 1, increasing=True))
+
+
+def confidence_band(x, y, grid=None, ci=95, band='analytic', n_boot=1000, seed=None, order=1):
+    """Fitted values of a degree-``order`` least-squares fit at ``grid``, with a ``ci``% confidence band.
+
+    Returns ``(yhat, lower, upper)``, each shaped like ``grid`` (100 points
+    over the range of ``x`` by default), or ``(grid, series)`` when ``y`` is
+    a ``(points, series)`` block. ``band`` is 'analytic' (the t interval of
+    the fitted mean) or 'bootstrap' (percentiles over ``n_boot`` resamples of
+    the points, drawn from ``np.random.default_rng(seed)``, as ``regplot``
+    does). With ``ci=None`` the bounds are None.
+    """
+    if band not in ('analytic', 'bootstrap'):
+        raise ValueError("band must be 'analytic' or 'bootstrap', not {!r}".format(band))
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) != len(y):
+        raise ValueError('{} x values for series of length {}'.format(len(x), len(y)))
+    if len(x) <= order + 1:
+        raise ValueError('a degree {} fit with a band needs more than {} points'.format(order, order + 1))
+    grid = np.linspace(x.min(), x.max(), 100) if grid is None else np.asarray(grid, dtype=float)
+
+    design, at = _design(x, grid, order)
+    inverse = np.linalg.pinv(design)
+    yhat = at @ (inverse @ y)
+    if ci is None:
+        return yhat, None, None
+
+    if band == 'analytic':
+        # se of the fitted mean: s * sqrt(g (X'X)^-1 g') at every grid point g, with (X'X)^-1 = X+ X+'
+        residuals = y - design @ (inverse @ y)
+        dof = len(x) - design.shape[1]
+        s = np.sqrt((residuals ** 2).sum(axis=0) / dof)
+        leverage = np.sqrt((((at @ inverse) ** 2).sum(axis=1)))
+        half = _t_quantile(0.5 + ci / 200, dof) * (leverage[:, None] * s if y.ndim > 1 else leverage * s)
+        return yhat, yhat - half, yhat + half
+
+    # all resamples at once: (n_boot, points) indices, a stacked pinv and one product for every fit
+    resamples = np.random.default_rng(seed).integers(0, len(x), size=(n_boot, len(x)))
+    coefficients = np.linalg.pinv(design[resamples]) @ y[resamples].reshape(n_boot, len(x), -1)
+    fitted = at @ coefficients
+    lower, upper = np.nanpercentile(fitted, [50 - ci / 2, 50 + ci / 2], axis=0)
+    if y.ndim == 1:
+        lower, upper = lower[:, 0], upper[:, 0]
+    return yhat, lower, upper
+
+
+def draw_regression(ax, x, y, color=None, marker='o', ci=95, band='analytic', n_boot=1000, seed=None, order=1,
+                    truncate=False, label=None, scatter_kws=None, line_kws=None):
+    """Scatter ``y`` against ``x`` and draw the fitted line with its band on ``ax``, like ``sns.regplot``.
+
+    The band options are those of ``confidence_band``. As in ``regplot``, the
+    line spans the x limits after the points are drawn unless ``truncate``.
+    Pairs with a missing value are dropped. Returns ``ax``.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[keep], y[keep]
+    scatter_kws = dict(scatter_kws or {})
+    line_kws = dict(line_kws or {})
+
+    if color is None:
+        color = ax._get_lines.get_next_color()
+    color = mpl.colors.to_hex(color)
+    scatter_kws.setdefault('color', color)
+    line_kws.setdefault('color', color)
+
+    # line-like markers get the line width, as regplot gives them
+    line_marker = marker in ('1', '2', '3', '4', '+', 'x', '|', '_')
+    scatter_kws.setdefault('linewidths', mpl.rcParams['lines.linewidth' if line_marker else 'lines.markeredgewidth'])
+    scatter_kws.setdefault('alpha', .8)
+    ax.scatter(x, y, marker=marker, label=label, **scatter_kws)
+
+    grid = np.linspace(*((x.min(), x.max()) if truncate else ax.get_xlim()), 100)
+    yhat, lower, upper = confidence_band(x, y, grid, ci=ci, band=band, n_boot=n_boot, seed=seed, order=order)
+    line_kws.setdefault('linewidth', mpl.rcParams['lines.linewidth'] * 1.5)
+    line, = ax.plot(grid, yhat, **line_kws)
+    if not truncate:
+        line.sticky_edges.x[:] = grid[0], grid[-1]
+    if lower is not None:
+        ax.fill_between(grid, lower, upper, facecolor=line_kws['color'], alpha=.15)
+    return ax
@@ -0,0 +1,65 @@
+"""Shares of total for pie charts, from the pre-aggregated cube.
+
+``df_can.groupby('Continent', axis=0).sum()`` aggregates every column of the
+table, including text columns such as Region and DevName, only for the pie to
+use 'Total'. The grouped sums already live in ``AggregateCube`` (summed once
+over integer codes of the grouping columns), so ``share_table`` takes a
+roll-up such as ``cube.query(by='Continent')``, adds the percentage of each
+group and can fold everything beyond the ``top`` groups into an 'Other'
+bucket. ``draw_shares`` draws the pie and writes those precomputed
+percentages on it, instead of recomputing them through ``autopct``.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def share_table(table, name='Total', top=None, other='Other', sort=False):
+    """Add each group's 'Share' of ``table[name]``, in percent, to the grouped ``table``.
+
+    ``table`` has one row per group, e.g. ``cube.query(by='Region')``; a
+    MultiIndex (several ``by`` dimensions) is flattened to 'Asia / Eastern
+    Asia' labels. With ``top`` the ``top`` largest groups are kept and the
+    rest summed into an ``other`` row (placed last). ``sort`` orders the
+    groups by size, largest first; otherwise they stay in table order.
+    """
+    table = table.copy()
+    if isinstance(table.index, pd.MultiIndex):
+        table.index = pd.Index([' / '.join(map(str, key)) for key in table.index], name=' / '.join(
+            str(level) for level in table.index.names))
+    totals = table[name].to_numpy()
+
+    if sort or (top is not None and len(table) > top):
+        order = np.argsort(-totals, kind='stable')
+        if top is not None and len(table) > top:
+            kept, rest = order[:top], order[top:]
+            kept = kept if sort else np.sort(kept)
+            folded = table.iloc[rest].sum().to_frame(other).T.astype(table.dtypes)
+            table = pd.concat([table.iloc[kept], folded])
+        else:
+            table = table.iloc[order]
+
+    grand = table[name].sum()
+    table['Share'] = 100.0 * table[name] / grand if grand else 0.0
+    return table
+
+
+def draw_shares(ax, table, column='Total', fmt='{:.1f}%', min_share=0, pctdistance=0.6, labels=True,
+                startangle=90, shadow=True, **pie_kwargs):
+    """A pie of ``table[column]`` labelled with the table's precomputed 'Share' percentages.
+
+    Percentages below ``min_share`` are left off (useful with many small
+    groups). Other keywords (colors, explode, ...) go to ``ax.pie``. Returns
+    the wedges.
+    """
+    wedges, _ = ax.pie(table[column].to_numpy(), labels=list(table.index) if labels else None,
+                       startangle=startangle, shadow=shadow, **pie_kwargs)
+    for wedge, share in zip(wedges, table['Share'].to_numpy()):
+        if share < min_share:
+            continue
+        angle = np.deg2rad((wedge.theta1 + wedge.theta2) / 2)
+        x = wedge.center[0] + pctdistance * wedge.r * np.cos(angle)
+        y = wedge.center[1] + pctdistance * wedge.r * np.sin(angle)
+        ax.text(x, y, fmt.format(share), ha='center', va='center', clip_on=False)
+    ax.axis('equal')
+    return wedges
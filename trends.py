@@ -0,0 +1,70 @@
+"""Least-squares trend lines for every country at once.
+
+Script 3 fits ``np.polyfit(x, y, deg=1)`` to one series. Fitting every
+country that way is 195 Python-level calls, each building its own design
+matrix. All countries share the same x (the years), so ``fit_trends`` builds
+the Vandermonde design matrix once and solves for every country with a
+single ``np.linalg.lstsq`` over the ``(years, countries)`` block, then scores
+each fit with R².
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _coefficient_names(degree):
+    if degree == 1:
+        return ['slope', 'intercept']
+    return ['c{}'.format(power) for power in range(degree, -1, -1)]
+
+
+def fit_trends(data, x=None, degree=1):
+    """Fit a degree-``degree`` polynomial to every series; returns one row per series.
+
+    ``data`` is a ``YearMatrix``, a DataFrame with x down and series across
+    (``YearMatrix.frame``) or a ``(points, series)`` array with ``x`` given.
+    The columns are 'slope' and 'intercept' for straight lines, otherwise
+    'c<k>' for the coefficient of x**k (highest power first, as
+    ``np.polyfit`` returns them), followed by 'r2'. The coefficients equal
+    ``np.polyfit(x, y, degree)`` for each series.
+    """
+    if hasattr(data, 'time_major'):
+        x = data.year_numbers if x is None else x
+        block, names = data.time_major(), list(data.countries)
+    elif isinstance(data, pd.DataFrame):
+        x = data.index.to_numpy() if x is None else x
+        block, names = data.to_numpy(), list(data.columns)
+    else:
+        block = np.asarray(data)
+        block = block.reshape(len(block), -1)
+        names = list(range(block.shape[1]))
+    if x is None:
+        raise ValueError('x is needed to fit a plain array')
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(block, dtype=float)
+    if len(x) != len(y):
+        raise ValueError('{} x values for series of length {}'.format(len(x), len(y)))
+    if len(x) <= degree:
+        raise ValueError('a degree {} fit needs more than {} points'.format(degree, degree))
+
+    # one design matrix for all series, columns scaled to unit length as np.polyfit does
+    design = np.vander(x, degree + 1)
+    scale = np.sqrt((design * design).sum(axis=0))
+    coefficients, _, _, _ = np.linalg.lstsq(design / scale, y, rcond=None)
+    coefficients = coefficients / scale[:, None]
+
+    residuals = y - design @ coefficients
+    total = ((y - y.mean(axis=0)) ** 2).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r2 = np.where(total > 0, 1 - (residuals ** 2).sum(axis=0) / total, np.nan)
+
+    table = pd.DataFrame(coefficients.T, index=names, columns=_coefficient_names(degree))
+    table['r2'] = r2
+    return table
+
+
+def trend_values(table, x):
+    """Evaluate the fitted polynomials of ``table`` (from ``fit_trends``) at ``x``; one column per series."""
+    coefficients = table.drop(columns='r2').to_numpy().T
+    x = np.asarray(x, dtype=float)
+    return pd.DataFrame(np.vander(x, len(coefficients)) @ coefficients, index=x, columns=table.index)
@@ -0,0 +1,174 @@
+"""Country x year immigration counts as one contiguous int32 block.
+
+The charts keep selecting string-labelled year columns out of ``df_can`` and
+transposing them, and every ``df_can.loc[..., years].transpose()`` copies the
+selection. ``YearMatrix`` keeps the 1980 - 2013 counts in a single C-ordered
+array with a country -> row and year -> column index, so one country, a run of
+countries or the whole time-major block are plain NumPy views.
+
+New annual releases are appended with ``YearMatrix.append_year``, which
+updates the per-country totals and every derived table registered through
+``subscribe`` (such as ``AggregateCube``, which holds the continent, region
+and development-group sums) from the new column alone, so a refresh
+costs O(countries) instead of O(countries x years).
+"""
+
+import numpy as np
+import pandas as pd
+
+from canada_data import CANADA_URL, DEFAULT_MAX_AGE, load_snapshot, snapshot_canada
+
+
+class YearMatrix:
+    """Immigration counts with one row per country and one column per year.
+
+    ``values`` is the ``(countries, years)`` int32 block, ``row`` and ``col``
+    map country names and year labels ('1980' ... '2013') to positions, and
+    ``attributes`` holds the per-country text columns (Continent, Region,
+    DevName) as object arrays aligned with the rows, and ``totals`` the int64
+    sum over all years (the 'Total' column).
+
+    After ``append_year`` the rows of ``values`` are still contiguous, but the
+    block may be a column slice of a larger buffer with room for more years.
+    """
+
+    def __init__(self, values, countries, years, attributes=None, totals=None):
+        values = np.asarray(values)
+        if values.dtype != np.int32 or not values.flags.c_contiguous:
+            values = np.ascontiguousarray(values, dtype=np.int32)
+        if values.shape != (len(countries), len(years)):
+            raise ValueError('values has shape {}, expected {} countries x {} years'
+                             .format(values.shape, len(countries), len(years)))
+
+        self.values = values
+        self._buffer = values
+        self._listeners = []
+        self.totals = (values.sum(axis=1, dtype=np.int64) if totals is None
+                       else np.array(totals, dtype=np.int64))
+        self.countries = list(countries)
+        self.years = [str(year) for year in years]
+        self.row = {name: i for i, name in enumerate(self.countries)}
+        self.col = {year: j for j, year in enumerate(self.years)}
+        self.attributes = {name: np.asarray(column, dtype=object)
+                           for name, column in (attributes or {}).items()}
+
+    @classmethod
+    def from_frame(cls, df, years=None):
+        """Build from a cleaned, country-indexed frame such as ``df_can``."""
+        if years is None:
+            years = [column for column in df.columns if str(column).isdigit()]
+        text = [column for column in df.columns if column not in years and column != 'Total']
+        return cls(df[years].to_numpy(), df.index, years,
+                   {column: df[column].to_numpy() for column in text})
+
+    @classmethod
+    def from_snapshot(cls, path, mmap_mode='r'):
+        """Build directly on a snapshot written by ``canada_data.write_snapshot``.
+
+        The block stays memory-mapped, so nothing is copied or parsed.
+        """
+        meta, years, totals = load_snapshot(path, mmap_mode=mmap_mode)
+        return cls(years, meta['countries'], meta['years'], meta['columns'], totals)
+
+    @classmethod
+    def load(cls, source=CANADA_URL, cache_dir=None, max_age=DEFAULT_MAX_AGE):
+        """Memory-map the matrix of the cached Canada workbook (see ``canada_data``)."""
+        return cls.from_snapshot(snapshot_canada(source, cache_dir, max_age=max_age))
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def year_numbers(self):
+        """The year labels as integers, handy as an x axis."""
+        return np.array([int(year) for year in self.years])
+
+    def rows(self, names):
+        """Row positions of ``names``; raises ``KeyError`` for unknown countries."""
+        return np.array([self.row[name] for name in names], dtype=np.intp)
+
+    def country(self, name):
+        """One country's series over all years (a view)."""
+        return self.values[self.row[name]]
+
+    def year(self, year):
+        """One year's counts for every country (a strided view)."""
+        return self.values[:, self.col[str(year)]]
+
+    def year_range(self, start, stop):
+        """Column slice for years ``start`` <= year < ``stop`` (a view)."""
+        return self.values[:, self.col[str(start)]:self.col[str(stop - 1)] + 1]
+
+    def block(self, names):
+        """The ``(len(names), years)`` block for several countries.
+
+        Countries that sit in consecutive rows come back as a view; any other
+        selection is gathered, which copies just those rows.
+        """
+        rows = self.rows(names)
+        if len(rows) and np.all(np.diff(rows) == 1):
+            return self.values[rows[0]:rows[-1] + 1]
+        return self.values[rows]
+
+    def time_major(self, names=None):
+        """The ``(years, countries)`` block, i.e. ``df_can[years].transpose()``, as a view."""
+        return (self.values if names is None else self.block(names)).T
+
+    def frame(self, names=None):
+        """Time-major DataFrame ready for ``.plot()``: integer years down, countries across.
+
+        Wraps ``time_major`` without copying, so it replaces
+        ``df_can.loc[names, years].transpose()`` in the charts.
+        """
+        countries = self.countries if names is None else list(names)
+        return pd.DataFrame(self.time_major(names), index=self.year_numbers, columns=countries, copy=False)
+
+    def subscribe(self, listener):
+        """Register ``listener(year, counts)`` to be called after every ``append_year``.
+
+        Derived tables use this to fold in a new year column incrementally.
+        Returns ``listener`` so it can be used as a decorator.
+        """
+        self._listeners.append(listener)
+        return listener
+
+    def append_year(self, year, counts):
+        """Add the column for a new ``year`` and update everything derived from it.
+
+        ``counts`` is either an array aligned with ``countries`` or a mapping
+        (dict, Series) from country name to count; countries missing from a
+        mapping get 0. Storage grows geometrically, so appending a year only
+        touches the new column apart from an occasional resize.
+        """
+        year = str(year)
+        if year in self.col:
+            raise ValueError('year {} is already in the matrix'.format(year))
+
+        if isinstance(counts, (dict, pd.Series)):
+            counts = pd.Series(counts)
+            unknown = set(counts.index) - set(self.row)
+            if unknown:
+                raise KeyError('unknown countries: {}'.format(', '.join(sorted(map(str, unknown)))))
+            column = np.zeros(len(self.countries), dtype=np.int32)
+            column[self.rows(counts.index)] = counts.to_numpy()
+        else:
+            column = np.asarray(counts, dtype=np.int32)
+            if column.shape != (len(self.countries),):
+                raise ValueError('expected {} counts, got {}'.format(len(self.countries), column.shape))
+
+        n = len(self.years)
+        if n == self._buffer.shape[1] or not self._buffer.flags.writeable:
+            # out of room, or still the read-only mapped snapshot: move to a larger private buffer
+            buffer = np.zeros((len(self.countries), max(2 * n, n + 1)), dtype=np.int32)
+            buffer[:, :n] = self.values
+            self._buffer = buffer
+        self._buffer[:, n] = column
+        self.values = self._buffer[:, :n + 1]
+
+        self.years.append(year)
+        self.col[year] = n
+        self.totals = self.totals + column
+        for listener in self._listeners:
+            listener(year, column)
+